@@ -0,0 +1,54 @@
+"""
+QMC Agent - Shared Playwright Page Helpers
+Used in-process by the legacy async nodes and by the subprocess scripts
+(playwright_runner puts the project root on their PYTHONPATH).
+"""
+
+import re
+from datetime import datetime
+from typing import Optional
+
+# Requests the scraping never reads (aborted before they leave the browser):
+# by resource type, so extension-less images and CSS-loaded fonts are caught too
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+TELEMETRY_HOSTS = re.compile(r"google-analytics\.com|googletagmanager\.com|doubleclick\.net|hotjar\.com|segment\.io", re.IGNORECASE)
+
+
+def block_assets(route):
+    """
+    Route handler: abort images/fonts/media and telemetry, let the rest through.
+    Works with both APIs: the async one awaits the returned coroutine.
+    """
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or TELEMETRY_HOSTS.search(request.url):
+        return route.abort()
+    return route.continue_()
+
+
+def _error_screenshot_path(name: str, retry_count: Optional[int]) -> str:
+    attempt = f"_{retry_count}" if retry_count is not None else ""
+    return f"error_{name}{attempt}_{datetime.now().strftime('%H%M%S')}.jpg"
+
+
+# Viewport JPEG: cheap to encode, and enough to see why the step failed
+_SCREENSHOT_OPTIONS = {"type": "jpeg", "quality": 60, "full_page": False}
+
+
+def save_error_screenshot(page, name: str, retry_count: Optional[int] = None) -> Optional[str]:
+    """Screenshot a failed sync page as error_<name>[_<retry>]_<HHMMSS>.jpg; None if it could not be taken."""
+    path = _error_screenshot_path(name, retry_count)
+    try:
+        page.screenshot(path=path, **_SCREENSHOT_OPTIONS)
+    except Exception:
+        return None
+    return path
+
+
+async def save_error_screenshot_async(page, name: str, retry_count: Optional[int] = None) -> Optional[str]:
+    """Async-API version of save_error_screenshot."""
+    path = _error_screenshot_path(name, retry_count)
+    try:
+        await page.screenshot(path=path, **_SCREENSHOT_OPTIONS)
+    except Exception:
+        return None
+    return path
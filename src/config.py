@@ -4,81 +4,164 @@ Loads environment variables and provides configuration constants.
 """
 
 import os
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Final
 from dotenv import load_dotenv
 
+_ENV_LOADED = False
+
+
+def load_environment() -> None:
+    """Load the .env file once per process (later calls are no-ops)."""
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    load_dotenv()
+    _ENV_LOADED = True
+
+
+def _build_prefix_index(prefixes) -> dict:
+    """Index prefixes by first character as {char: ((normalized, prefix), ...)}."""
+    index = {}
+    for prefix in prefixes:
+        normalized = prefix.strip().lower()
+        index.setdefault(normalized[:1], []).append((normalized, prefix))
+    return {char: tuple(entries) for char, entries in index.items()}
+
+
+@dataclass(frozen=True, slots=True)
+class Selectors(Mapping):
+    """
+    QMC CSS selectors as pre-resolved attributes (SELECTORS.spinner).
+    
+    Still a read-only Mapping, so scripts receiving it as JSON and
+    "key in SELECTORS" checks keep working.
+    """
+    username_input: str
+    password_input: str
+    login_button: str
+    spinner: str
+    grid: str
+    last_execution_filter: str
+    today_option: str
+    tags_filter: str
+    tags_search: str
+    apply_button: str
+    show_more_button: str
+    table_rows: str
+    
+    def __getitem__(self, key: str) -> str:
+        if key not in self.__dataclass_fields__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __iter__(self):
+        return iter(self.__dataclass_fields__)
+    
+    def __len__(self) -> int:
+        return len(self.__dataclass_fields__)
+
+
 # Load environment variables from .env file
-load_dotenv()
+load_environment()
+
+
+# CSS Selectors (QMC)
+SELECTORS: Final[Selectors] = Selectors(
+    # Login
+    username_input="input[type='text'], input[name='username'], #username",
+    password_input="input[type='password'], input[name='password'], #password",
+    login_button="button[type='submit'], .login-button",
+    
+    # General
+    spinner=".qv-loader, .spinner, .loading-indicator, .lui-spinner",
+    grid="table, .qmc-grid",
+    
+    # Filters
+    last_execution_filter="th:has-text('Last execution'), .header-cell:has-text('Last'), [data-tid*='last']",
+    today_option=".lui-select-option:has-text('Today'), option:has-text('Today'), div:has-text('Today')",
+    tags_filter="th.column:has-text('Tags') .qmc-filter-button button",
+    tags_search=".qmc-filter-popup input, .lui-popover input",
+    apply_button=".qmc-filter-popup button:has-text('Apply'), .lui-popover button:has-text('Apply')",
+    
+    # Pagination
+    show_more_button="button:has-text('Show more'), .lui-button:has-text('Show more'), [title='Show more']",
+    
+    # Data Extraction
+    table_rows="tbody tr, .lui-list-item, .qmc-row",
+)
 
 
 class Config:
     """Configuration class for QMC Agent."""
     
     # QMC Connection
-    QMC_URL: str = os.getenv("QMC_URL", "https://apqs.grupoefe.pe/qmc/tasks")
-    QMC_USERNAME: str = os.getenv("QMC_USERNAME", "")
-    QMC_PASSWORD: str = os.getenv("QMC_PASSWORD", "")
+    # Values are read from the environment once, when the class body runs.
+    QMC_URL: Final[str] = os.getenv("QMC_URL", "https://apqs.grupoefe.pe/qmc/tasks")
+    QMC_USERNAME: Final[str] = os.getenv("QMC_USERNAME", "")
+    QMC_PASSWORD: Final[str] = os.getenv("QMC_PASSWORD", "")
     
     # Groq LLM
-    GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
-    GROQ_MODEL: str = "llama-3.3-70b-versatile" 
+    GROQ_API_KEY: Final[str] = os.getenv("GROQ_API_KEY", "")
+    GROQ_MODEL: Final[str] = "llama-3.3-70b-versatile" 
+    # Max concurrent LLM requests per analyst node (Groq rate limits)
+    LLM_CONCURRENCY: Final[int] = int(os.getenv("LLM_CONCURRENCY", "3"))
+    # Ask the LLM only for groups the rule-based classifiers can't decide (unknown statuses);
+    # when false, unknown statuses are treated as pending and no LLM call is made
+    LLM_FALLBACK: Final[bool] = os.getenv("LLM_FALLBACK", "true").lower() == "true"
     
     # Scraping Configuration
-    MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
-    HEADLESS: bool = os.getenv("HEADLESS", "true").lower() == "true"
-    TIMEOUT_MS: int = int(os.getenv("TIMEOUT_MS", "60000"))
+    MAX_RETRIES: Final[int] = int(os.getenv("MAX_RETRIES", "3"))
+    HEADLESS: Final[bool] = os.getenv("HEADLESS", "true").lower() == "true"
+    TIMEOUT_MS: Final[int] = int(os.getenv("TIMEOUT_MS", "60000"))
     
     # Search/Pagination
-    PAGINATION_MAX_CLICKS: int = int(os.getenv("PAGINATION_MAX_CLICKS", "10"))
+    PAGINATION_MAX_CLICKS: Final[int] = int(os.getenv("PAGINATION_MAX_CLICKS", "10"))
     
     # Process Monitoring
     # Format: tag_name:alias (optional)
-    MONITORED_PROCESSES = {
+    # Lookup tables below are read-only views; pass dict(...) where a copy is needed
+    MONITORED_PROCESSES: Final[Mapping[str, str]] = MappingProxyType({
         "FE_HITOS_DIARIO": "Hitos",
         "FE_COBRANZAS_DIARIA": "Cobranzas",
         "FE_PASIVOS": "Pasivos", 
         "FE_PRODUCCION": "Reporte de Producción",
         "FE_CALIDADCARTERA_DIARIO": "Calidad de Cartera"
-    }
+    })
+    # Matches any monitored tag inside a task's Tags text (one scan per task)
+    MONITORED_TAGS_RE: Final[re.Pattern] = re.compile("|".join(map(re.escape, MONITORED_PROCESSES)))
 
-    # CSS Selectors (QMC)
-    SELECTORS = {
-        # Login
-        "username_input": "input[type='text'], input[name='username'], #username",
-        "password_input": "input[type='password'], input[name='password'], #password",
-        "login_button": "button[type='submit'], .login-button",
-        
-        # General
-        "spinner": ".qv-loader, .spinner, .loading-indicator, .lui-spinner",
-        
-        # Filters
-        "last_execution_filter": "th:has-text('Last execution'), .header-cell:has-text('Last'), [data-tid*='last']",
-        "today_option": ".lui-select-option:has-text('Today'), option:has-text('Today'), div:has-text('Today')",
-        
-        # Pagination
-        "show_more_button": "button:has-text('Show more'), .lui-button:has-text('Show more'), [title='Show more']",
-        
-        # Data Extraction
-        "table_rows": "tbody tr, .lui-list-item, .qmc-row"
-    }
+    # CSS Selectors (QMC), also importable as src.config.SELECTORS
+    SELECTORS: Final[Selectors] = SELECTORS
     
     # ==================== NPrinting Configuration ====================
     
     # NPrinting Connection
-    NPRINTING_URL: str = os.getenv("NPRINTING_URL", "https://10.142.16.45:4993/#/tasks/executions")
-    NPRINTING_EMAIL: str = os.getenv("NPRINTING_EMAIL", "")
-    NPRINTING_PASSWORD: str = os.getenv("NPRINTING_PASSWORD", "")
+    NPRINTING_URL: Final[str] = os.getenv("NPRINTING_URL", "https://10.142.16.45:4993/#/tasks/executions")
+    NPRINTING_EMAIL: Final[str] = os.getenv("NPRINTING_EMAIL", "")
+    NPRINTING_PASSWORD: Final[str] = os.getenv("NPRINTING_PASSWORD", "")
+    
+    # Saved-session reuse: login is skipped while one of these cookies in
+    # nprinting_browser_state.json stays valid for at least COOKIE_MIN_TTL seconds
+    NPRINTING_AUTH_COOKIES: Final[tuple] = tuple(os.getenv("NPRINTING_AUTH_COOKIES", "NPWEBCONSOLE_SESSION").split(","))
+    COOKIE_MIN_TTL: Final[int] = int(os.getenv("COOKIE_MIN_TTL", "300"))
     
     # NPrinting Process Monitoring (prefix patterns)
     # Format: prefix_pattern: alias
-    NPRINTING_MONITORED = {
+    NPRINTING_MONITORED: Final[Mapping[str, str]] = MappingProxyType({
         "h.": "Hitos",                     # e.g., h. Tablero Eficiencia Comercial
         "q1.": "Calidad de Cartera",       # e.g., q1. Reporte Calidad
         "k.": "Reporte de Producción",     # e.g., k. Reporte Produccion
         "x.": "Cobranzas",                 # e.g., x.Cobranza Diaria
-    }
+    })
+    # First-character dispatch over NPRINTING_MONITORED for one-pass task bucketing
+    NPRINTING_PREFIX_INDEX: Final[Mapping[str, tuple]] = MappingProxyType(_build_prefix_index(NPRINTING_MONITORED))
     
     # NPrinting CSS Selectors
-    NPRINTING_SELECTORS = {
+    NPRINTING_SELECTORS: Final[Mapping[str, str]] = MappingProxyType({
         # Login
         "email_input": "input[type='email'], input[name='email'], input[placeholder*='mail']",
         "password_input": "input[type='password']",
@@ -95,26 +178,18 @@ class Config:
         "table": "table, .data-table, [role='grid']",
         "table_rows": "tbody tr, .task-row, [role='row']",
         "table_headers": "thead th, .header-cell, [role='columnheader']"
-    }
+    })
+    
+    # Required settings, checked by validate() / validate_nprinting()
+    REQUIRED: Final[tuple] = ("QMC_USERNAME", "QMC_PASSWORD", "GROQ_API_KEY")
+    REQUIRED_NPRINTING: Final[tuple] = ("NPRINTING_EMAIL", "NPRINTING_PASSWORD")
     
     @classmethod
     def validate(cls) -> list[str]:
         """Validate required configuration files."""
-        missing = []
-        if not cls.QMC_USERNAME:
-            missing.append("QMC_USERNAME")
-        if not cls.QMC_PASSWORD:
-            missing.append("QMC_PASSWORD")
-        if not cls.GROQ_API_KEY:
-            missing.append("GROQ_API_KEY")
-        return missing
+        return [name for name in cls.REQUIRED if not getattr(cls, name)]
     
     @classmethod
     def validate_nprinting(cls) -> list[str]:
         """Validate NPrinting configuration."""
-        missing = []
-        if not cls.NPRINTING_EMAIL:
-            missing.append("NPRINTING_EMAIL")
-        if not cls.NPRINTING_PASSWORD:
-            missing.append("NPRINTING_PASSWORD")
-        return missing
+        return [name for name in cls.REQUIRED_NPRINTING if not getattr(cls, name)]
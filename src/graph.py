@@ -4,59 +4,56 @@ Multi-Agent Workflow with QMC + NPrinting integration.
 Reorganized with separated node packages.
 """
 
-from typing import Literal
+from functools import lru_cache
+from typing import Any, Dict, Literal, Tuple
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
 from src.state import QMCState, create_initial_state
 
-# Import QMC Nodes from qmc package
-from src.nodes.qmc.login_node_sync import login_node_sync
-from src.nodes.qmc.extractor import extractor_node
-from src.nodes.qmc.analyst_llm import analyst_llm_node
-
-# Import NPrinting Nodes from nprinting package
-from src.nodes.nprinting.login_node import nprinting_login_node
-from src.nodes.nprinting.extractor import nprinting_extractor_node
-from src.nodes.nprinting.analyst import nprinting_analyst_node
-
-# Import Combined/Shared Nodes
-from src.nodes.combined_analyst import combined_analyst_node
-from src.nodes.reporter import reporter_node
-
 
 # ============ Wrappers (Async/Sync Adapters) ============
+# Node modules are imported inside each wrapper so Playwright, LangChain and
+# Groq clients are only loaded when the node actually runs.
 
 def qmc_login_agent(state: QMCState) -> dict:
     """Wrapper for QMC Login Node."""
+    from src.nodes.qmc.login_node_sync import login_node_sync
     return login_node_sync(state)
 
-def qmc_extractor_agent(state: QMCState) -> dict:
+async def qmc_extractor_agent(state: QMCState) -> dict:
     """Wrapper for QMC Extractor Node."""
-    return extractor_node(state)
+    from src.nodes.qmc.extractor import extractor_node
+    return await extractor_node(state)
 
 async def qmc_analyst_agent(state: QMCState) -> dict:
     """Wrapper for QMC Analyst Node."""
+    from src.nodes.qmc.analyst_llm import analyst_llm_node
     return await analyst_llm_node(state)
 
 def nprinting_login_agent(state: QMCState) -> dict:
     """Wrapper for NPrinting Login Node."""
+    from src.nodes.nprinting.login_node import nprinting_login_node
     return nprinting_login_node(state)
 
 def nprinting_extractor_agent(state: QMCState) -> dict:
     """Wrapper for NPrinting Extractor Node."""
+    from src.nodes.nprinting.extractor import nprinting_extractor_node
     return nprinting_extractor_node(state)
 
 async def nprinting_analyst_agent(state: QMCState) -> dict:
     """Wrapper for NPrinting Analyst Node."""
+    from src.nodes.nprinting.analyst import nprinting_analyst_node
     return await nprinting_analyst_node(state)
 
 async def combined_analyst_agent(state: QMCState) -> dict:
     """Wrapper for Combined Analyst Node."""
+    from src.nodes.combined_analyst import combined_analyst_node
     return await combined_analyst_node(state)
 
 def reporter_agent(state: QMCState) -> dict:
     """Wrapper for Reporter Node."""
+    from src.nodes.reporter import reporter_node
     return reporter_node(state)
 
 def error_agent(state: QMCState) -> dict:
@@ -114,6 +111,30 @@ def sync_node(state: QMCState) -> dict:
 
 # ============ Graph Construction ============
 
+# Compiled apps keyed by (graph name, id(checkpointer)). The checkpointer is
+# stored alongside the app so its id cannot be reused while cached.
+_COMPILED: Dict[Tuple[str, int], Tuple[Any, Any]] = {}
+
+
+def _compile_cached(name: str, builder: StateGraph, checkpointer=None):
+    """
+    Compile a graph once per explicit checkpointer and reuse the runnable app.
+    Without one, every call gets a fresh MemorySaver so runs never share threads.
+    """
+    if checkpointer is None:
+        return builder.compile(checkpointer=MemorySaver())
+    
+    key = (name, id(checkpointer))
+    cached = _COMPILED.get(key)
+    if cached is not None and cached[0] is checkpointer:
+        return cached[1]
+    
+    app = builder.compile(checkpointer=checkpointer)
+    _COMPILED[key] = (checkpointer, app)
+    return app
+
+
+@lru_cache(maxsize=1)
 def build_unified_graph() -> StateGraph:
     """
     Builds the Unified Multi-Agent Workflow with QMC + NPrinting.
@@ -215,14 +236,16 @@ def build_unified_graph() -> StateGraph:
 
 
 def compile_unified_graph(checkpointer=None):
-    """Compile the unified graph into a runnable app."""
-    if checkpointer is None:
-        checkpointer = MemorySaver()
-    return build_unified_graph().compile(checkpointer=checkpointer)
+    """
+    Compile the unified graph into a runnable app.
+    Cached per checkpointer; without one, each call gets its own MemorySaver.
+    """
+    return _compile_cached("unified", build_unified_graph(), checkpointer)
 
 
 # ============ Legacy Graph (QMC Only) ============
 
+@lru_cache(maxsize=1)
 def build_graph() -> StateGraph:
     """
     Legacy: Builds QMC-only workflow for backwards compatibility.
@@ -261,7 +284,5 @@ def build_graph() -> StateGraph:
 
 
 def compile_graph(checkpointer=None):
-    """Compile the legacy QMC-only graph."""
-    if checkpointer is None:
-        checkpointer = MemorySaver()
-    return build_graph().compile(checkpointer=checkpointer)
\ No newline at end of file
+    """Compile the legacy QMC-only graph (cached per explicit checkpointer)."""
+    return _compile_cached("legacy", build_graph(), checkpointer)
\ No newline at end of file
@@ -3,25 +3,33 @@ QMC Agent - Analyst Module
 Analyzes process status from extracted task data.
 """
 
-import json
+import asyncio
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import orjson
+
 from src.state import QMCState
 
 
-# ============ Pydantic Schemas ============
+# ============ Schemas ============
 
-class QMCTask(BaseModel):
+@dataclass(slots=True, frozen=True)
+class QMCTask:
     """Schema for a single QMC task."""
-    Name: str = Field(description="Task name")
-    Status: str = Field(description="Execution status")
-    Last_execution: Optional[str] = Field(default=None)
-    Next_execution: Optional[str] = Field(default=None)
-    Tags: List[str] = Field(default=[])
+    Name: str  # Task name
+    Status: str  # Execution status
+    Last_execution: Optional[str] = None
+    Next_execution: Optional[str] = None
+    Tags: Tuple[str, ...] = ()
 
 
-class ProcessStatusSummary(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ProcessStatusSummary:
     """Summary of task statuses."""
     total_tareas: int
     completadas: int  # Success
@@ -31,7 +39,8 @@ class ProcessStatusSummary(BaseModel):
     fallidas: int  # Failed, Aborted
 
 
-class ProcessStatus(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ProcessStatus:
     """Overall process status report."""
     proceso: str
     estado: str  # Completado, En proceso, Fallido, Pendiente
@@ -40,80 +49,83 @@ class ProcessStatus(BaseModel):
     resumen: ProcessStatusSummary
     tarea_inicio: Optional[str]
     tareas: List[dict]
+    
+    def to_dict(self) -> dict:
+        """Plain-dict view; task rows are shared, not deep-copied like asdict()."""
+        return {
+            "proceso": self.proceso,
+            "estado": self.estado,
+            "fecha": self.fecha,
+            "hora_observacion": self.hora_observacion,
+            "resumen": asdict(self.resumen),
+            "tarea_inicio": self.tarea_inicio,
+            "tareas": self.tareas,
+        }
 
 
 # ============ Analysis Functions ============
 
+# Accepted formats:
+#   YYYY-MM-DDTHH:MM[:SS], YYYY-MM-DD HH:MM[:SS]  -> groups 1-6
+#   DD/MM/YYYY HH:MM                               -> groups 7-11
+_DATETIME_RE = re.compile(
+    r"^(\d{4})-(\d{1,2})-(\d{1,2})[T ](\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$"
+    r"|^(\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{1,2})$",
+    re.ASCII
+)
+
+
+@lru_cache(maxsize=4096)
 def parse_datetime(dt_str: Optional[str]) -> Optional[datetime]:
     """Parse datetime string to datetime object."""
     if not dt_str:
         return None
     
-    # Handle various formats
-    formats = [
-        "%Y-%m-%dT%H:%M:%S",
-        "%Y-%m-%d %H:%M:%S",
-        "%Y-%m-%dT%H:%M",
-        "%Y-%m-%d %H:%M",
-        "%d/%m/%Y %H:%M",
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(dt_str, fmt)
-        except ValueError:
-            continue
-    return None
-
-
-def order_tasks_by_execution(tasks: List[dict]) -> List[dict]:
-    """Order tasks by Last_execution (earliest first)."""
-    def get_exec_time(task):
-        dt = parse_datetime(task.get("Last_execution") or task.get("Last execution"))
-        return dt if dt else datetime.max
+    match = _DATETIME_RE.match(dt_str)
+    if not match:
+        return None
     
-    return sorted(tasks, key=get_exec_time)
+    g = match.groups()
+    try:
+        if g[0] is not None:
+            return datetime(int(g[0]), int(g[1]), int(g[2]), int(g[3]), int(g[4]), int(g[5] or 0))
+        return datetime(int(g[8]), int(g[7]), int(g[6]), int(g[9]), int(g[10]))
+    except ValueError:
+        return None  # Out-of-range values (e.g. month 13)
 
 
-def find_start_task(tasks: List[dict]) -> Optional[str]:
-    """Find the task that initiates the process (contains 'INICIO')."""
+def detect_process_name(tasks: List[dict], default: str = "FE_HITOS_DIARIO") -> str:
+    """Return the first FE_HITOS tag found in the tasks' Tags, or the default."""
+    # Tags are homogeneous per export, so the first hit (normally row 0) is enough
     for task in tasks:
-        name = task.get("Name", "")
-        if "INICIO" in name.upper():
-            return name
-    return None
+        tags = task.get("Tags") or ()
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        for tag in tags:
+            if "FE_HITOS" in tag.upper():
+                return tag.strip()
+    return default
+
+
+# Upper-cased QMC status -> summary category
+_STATUS_MAP = {
+    "SUCCESS": "completadas", "SUCCEEDED": "completadas", "COMPLETED": "completadas",
+    "SKIPPED": "saltadas",
+    "RUNNING": "en_ejecucion", "EXECUTING": "en_ejecucion",
+    "STARTED": "pendientes", "QUEUED": "pendientes", "WAITING": "pendientes", "PENDING": "pendientes",
+    "FAILED": "fallidas", "ERROR": "fallidas", "ABORTED": "fallidas", "CANCELLED": "fallidas",
+}
 
 
 def classify_status(status: str) -> str:
     """Classify status into categories."""
-    status_upper = status.upper() if status else ""
-    
-    if status_upper in ["SUCCESS", "SUCCEEDED", "COMPLETED"]:
-        return "completadas"
-    elif status_upper in ["SKIPPED"]:
-        return "saltadas"
-    elif status_upper in ["RUNNING", "EXECUTING"]:
-        return "en_ejecucion"
-    elif status_upper in ["STARTED", "QUEUED", "WAITING", "PENDING"]:
-        return "pendientes"
-    elif status_upper in ["FAILED", "ERROR", "ABORTED", "CANCELLED"]:
-        return "fallidas"
-    else:
-        return "otro"
+    return _STATUS_MAP.get(status.upper() if status else "", "otro")
 
 
-def count_statuses(tasks: List[dict]) -> ProcessStatusSummary:
-    """Count tasks by status category."""
-    counts = {"completadas": 0, "saltadas": 0, "en_ejecucion": 0, "pendientes": 0, "fallidas": 0}
-    
-    for task in tasks:
-        status = task.get("Status", "")
-        category = classify_status(status)
-        if category in counts:
-            counts[category] += 1
-    
+def _build_summary(counts: Counter, total: int) -> ProcessStatusSummary:
+    """Build the status summary from per-category counts."""
     return ProcessStatusSummary(
-        total_tareas=len(tasks),
+        total_tareas=total,
         completadas=counts["completadas"],
         saltadas=counts["saltadas"],
         en_ejecucion=counts["en_ejecucion"],
@@ -152,23 +164,39 @@ def analyze_process_status(tasks: List[dict], process_name: str = "FE_HITOS_DIAR
     """
     now = datetime.now()
     
-    # Order tasks by execution time
-    ordered_tasks = order_tasks_by_execution(tasks)
+    # Single pass: sort keys, status counts and start task together
+    keys = []
+    counts = Counter()
+    start_task = None
+    start_time = None
     
-    # Find start task
-    start_task = find_start_task(ordered_tasks)
+    for task in tasks:
+        exec_time = parse_datetime(task.get("Last_execution") or task.get("Last execution")) or datetime.max
+        keys.append(exec_time)
+        counts[classify_status(task.get("Status"))] += 1
+        
+        # Earliest 'INICIO' task (ties keep input order, like the stable sort)
+        name = task.get("Name") or ""
+        if "INICIO" in name.upper() and (start_time is None or exec_time < start_time):
+            start_task, start_time = name, exec_time
+    
+    # Order tasks by execution time: argsort on the precomputed keys (no
+    # per-task tuples); ties keep input order
+    ordered_tasks = [tasks[i] for i in sorted(range(len(tasks)), key=keys.__getitem__)]
     
-    # Count statuses
-    summary = count_statuses(ordered_tasks)
+    summary = _build_summary(counts, len(tasks))
     
     # Determine overall status
     overall_status = determine_overall_status(summary)
     
+    # One ISO formatting call for both date and time
+    iso_now = now.isoformat(timespec="seconds")
+    
     return ProcessStatus(
         proceso=process_name,
         estado=overall_status,
-        fecha=now.strftime("%Y-%m-%d"),
-        hora_observacion=now.strftime("%H:%M:%S"),
+        fecha=iso_now[:10],
+        hora_observacion=iso_now[11:19],
         resumen=summary,
         tarea_inicio=start_task,
         tareas=ordered_tasks
@@ -187,87 +215,85 @@ def analyst_node_sync(state: QMCState) -> dict:
     Returns:
         Updated state dict with process_status
     """
-    log_entry = f"[{datetime.now().isoformat()}] ANALYST: Analyzing process status"
+    log_lines = [f"[{datetime.now().isoformat()}] ANALYST: Analyzing process status"]
     
     raw_data = state.get("raw_table_data", "")
     
     if not raw_data:
-        log_entry += "\n  No data to analyze"
+        log_lines.append("  No data to analyze")
         return {
             "current_step": "error",
             "error_message": "No table data available for analysis",
-            "logs": [log_entry]
+            "logs": ["\n".join(log_lines)]
         }
     
     try:
         # Parse raw data
-        if isinstance(raw_data, str):
-            data = json.loads(raw_data)
+        if isinstance(raw_data, (str, bytes)):
+            data = orjson.loads(raw_data)
         else:
             data = raw_data
         
         tasks = data.get("rows", []) if isinstance(data, dict) else data
-        log_entry += f"\n  Processing {len(tasks)} tasks"
+        log_lines.append(f"  Processing {len(tasks)} tasks")
         
-        # Debug: Show sample task and unique status values
+        # Debug: Show sample task keys
         if tasks:
-            sample = tasks[0]
-            log_entry += f"\n  Sample task keys: {list(sample.keys())}"
-            statuses = set(t.get("Status", t.get("status", "UNKNOWN")) for t in tasks)
-            log_entry += f"\n  Unique statuses found: {statuses}"
+            log_lines.append(f"  Sample task keys: {list(tasks[0].keys())}")
         
         # Detect process name from tags
-        process_name = "FE_HITOS_DIARIO"  # Default
-        for task in tasks:
-            tags = task.get("Tags", [])
-            if isinstance(tags, str):
-                tags = [t.strip() for t in tags.split(",")]
-            for tag in tags:
-                if "FE_HITOS" in tag.upper():
-                    process_name = tag
-                    break
+        process_name = detect_process_name(tasks)
         
         # Analyze process status
         status = analyze_process_status(tasks, process_name)
         r = status.resumen
-        log_entry += f"\n  Process: {status.proceso}"
-        log_entry += f"\n  Counts: {r.completadas} completadas, {r.saltadas} saltadas, {r.en_ejecucion} ejecutando, {r.pendientes} pendientes, {r.fallidas} fallidas"
-        log_entry += f"\n  Estado final: {status.estado}"
+        if tasks:
+            # Categories seen, taken from the summary instead of another pass
+            counts = asdict(r)
+            total = counts.pop("total_tareas")
+            found = tuple(k for k, v in counts.items() if v)
+            if sum(counts.values()) < total:
+                found += ("otro",)
+            log_lines.append(f"  Status categories found: {found}")
+        log_lines.append(f"  Process: {status.proceso}")
+        log_lines.append(f"  Counts: {r.completadas} completadas, {r.saltadas} saltadas, {r.en_ejecucion} ejecutando, {r.pendientes} pendientes, {r.fallidas} fallidas")
+        log_lines.append(f"  Estado final: {status.estado}")
         
         return {
             "current_step": "done",
-            "process_status": status.model_dump(),
+            "process_status": status.to_dict(),
             "structured_data": status.tareas,
             "error_message": None,
-            "logs": [log_entry]
+            "logs": ["\n".join(log_lines)]
         }
         
-    except json.JSONDecodeError as e:
-        log_entry += f"\n  JSON error: {str(e)}"
+    except orjson.JSONDecodeError as e:
+        log_lines.append(f"  JSON error: {str(e)}")
         return {
             "current_step": "error",
             "error_message": f"Failed to parse data: {str(e)}",
-            "logs": [log_entry]
+            "logs": ["\n".join(log_lines)]
         }
         
     except Exception as e:
-        log_entry += f"\n  Error: {str(e)}"
+        log_lines.append(f"  Error: {str(e)}")
         return {
             "current_step": "error",
             "error_message": f"Analysis failed: {str(e)}",
-            "logs": [log_entry]
+            "logs": ["\n".join(log_lines)]
         }
 
 
 # Async version for compatibility
 async def analyst_node(state: QMCState) -> dict:
-    """Async wrapper for analyst_node_sync."""
-    return analyst_node_sync(state)
+    """Async wrapper for analyst_node_sync (parsing runs off the event loop)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, analyst_node_sync, state)
 
 
 def format_output(process_status: dict) -> str:
     """Format process status as pretty JSON."""
-    return json.dumps(process_status, indent=2, ensure_ascii=False)
+    return orjson.dumps(process_status, option=orjson.OPT_INDENT_2).decode()
 
 
 # For testing
@@ -280,4 +306,4 @@ if __name__ == "__main__":
     ]
     
     result = analyze_process_status(test_tasks)
-    print(format_output(result.model_dump()))
+    print(format_output(result.to_dict()))
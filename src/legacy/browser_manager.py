@@ -0,0 +1,96 @@
+"""
+QMC Agent - Shared Browser Manager
+Keeps one Playwright/Chromium instance alive for the whole legacy workflow
+so login, filter and extract only open new pages instead of new browsers.
+"""
+
+from typing import Dict, Optional, Tuple, Union
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+from src.browser_utils import block_assets
+from src.config import Config
+
+# Session key for a storage_state kept in memory (no browser_state.json)
+MEMORY_SESSION = "memory"
+
+_playwright: Optional[Playwright] = None
+_browser: Optional[Browser] = None
+_contexts: Dict[Optional[str], BrowserContext] = {}
+_live_pages: Dict[Optional[str], Page] = {}
+
+
+async def get_browser() -> Browser:
+    """Launch Chromium on first use and return the shared instance."""
+    global _playwright, _browser
+    if _browser is None or not _browser.is_connected():
+        if _playwright is None:
+            _playwright = await async_playwright().start()
+        _browser = await _playwright.chromium.launch(headless=Config.HEADLESS)
+        _contexts.clear()
+        _live_pages.clear()
+    return _browser
+
+
+async def get_context(storage_state: Union[str, dict, None] = None, session: Optional[str] = None) -> BrowserContext:
+    """
+    Return the shared context for a session (one per session key).
+
+    Args:
+        storage_state: Saved state path or in-memory storage_state dict, or None for a fresh session
+        session: Session key; defaults to the storage_state path
+    """
+    key = session if session is not None else storage_state
+    context = _contexts.get(key)
+    if context is None:
+        browser = await get_browser()
+        context = await browser.new_context(storage_state=storage_state)
+        await context.route("**/*", block_assets)
+        _contexts[key] = context
+    return context
+
+
+def session_of(state: dict) -> Tuple[Optional[str], Union[str, dict, None]]:
+    """Return (session key, storage_state) for a workflow state, preferring the in-memory state."""
+    if state.get("browser_storage_state"):
+        return MEMORY_SESSION, state["browser_storage_state"]
+    path = state.get("browser_state_path")
+    return path, path
+
+
+async def keep_page(storage_state: Optional[str], page: Page) -> None:
+    """
+    Keep a page open so the next node of the same session continues on it
+    (already logged in, grid loaded) instead of navigating again.
+    """
+    previous = _contexts.get(storage_state)
+    if previous is not None and previous is not page.context:
+        await previous.close()
+    # Re-key the context (login creates it under None, before the state file exists)
+    for key, context in list(_contexts.items()):
+        if context is page.context:
+            del _contexts[key]
+    _contexts[storage_state] = page.context
+    _live_pages[storage_state] = page
+
+
+def live_page(storage_state: Optional[str]) -> Optional[Page]:
+    """Return the page kept for this session, if it is still open."""
+    page = _live_pages.get(storage_state)
+    if page is not None and page.is_closed():
+        del _live_pages[storage_state]
+        return None
+    return page
+
+
+async def close_all() -> None:
+    """Close every context, the browser and Playwright (call once at workflow end)."""
+    global _playwright, _browser
+    for context in list(_contexts.values()):
+        await context.close()
+    _contexts.clear()
+    _live_pages.clear()
+    if _browser is not None:
+        await _browser.close()
+        _browser = None
+    if _playwright is not None:
+        await _playwright.stop()
+        _playwright = None
@@ -4,20 +4,29 @@ Extracts table data from filtered QMC page.
 """
 
 import asyncio
-import re
+import orjson
 from datetime import datetime
-from playwright.async_api import async_playwright, Page, Browser, BrowserContext
-from src.config import Config
+from functools import lru_cache
+from selectolax.lexbor import LexborHTMLParser
+from playwright.async_api import Page
+from src.legacy.browser_manager import close_all, get_context, live_page, session_of
+from src.browser_utils import save_error_screenshot_async
+from src.config import Config, SELECTORS
 from src.state import QMCState
 
 
+# Table containers to look for, most specific first (substring class match)
+_TABLE_SELECTORS = ('div[class*="qmc-grid"]', 'table[class*="qmc-grid"]', 'tbody')
+
+
 async def extract_node(state: QMCState) -> dict:
     """
     Extract node: Extracts table data from QMC.
     
-    Can work in two modes:
-    1. From page_html in state (if filter_node provided it)
-    2. Fresh navigation with session restoration
+    Can work in three modes:
+    1. Pass-through when filter_node already set raw_table_data
+    2. From page_html in state (if filter_node provided it)
+    3. Fresh navigation with session restoration
     
     Args:
         state: Current workflow state
@@ -27,6 +36,15 @@ async def extract_node(state: QMCState) -> dict:
     """
     log_entry = f"[{datetime.now().isoformat()}] EXTRACT_NODE: Extracting table data"
     
+    # filter_node already handed over the grid HTML
+    if state.get("raw_table_data"):
+        log_entry += "\n  Using table data from previous node"
+        return {
+            "current_step": "analyze",
+            "error_message": None,
+            "logs": [log_entry]
+        }
+    
     # If we already have page HTML, extract from it
     if state.get("page_html"):
         log_entry += "\n  Using page HTML from previous node"
@@ -44,95 +62,95 @@ async def extract_node(state: QMCState) -> dict:
     # Otherwise, navigate fresh
     log_entry += "\n  Navigating to extract fresh data"
     
-    async with async_playwright() as p:
-        browser: Browser = await p.chromium.launch(headless=Config.HEADLESS)
+    session, storage_state = session_of(state)
+    
+    # Continue on the filtered page if the filter node left one open
+    page = live_page(session)
+    fresh = page is None
+    if fresh:
+        context = await get_context(storage_state, session=session)
+        page = await context.new_page()
+    
+    try:
+        if fresh:
+            await page.goto(Config.QMC_URL, timeout=Config.TIMEOUT_MS)
         
-        context: BrowserContext = await browser.new_context(
-            storage_state=state.get("browser_state_path")
+        # Wait for grid
+        await page.wait_for_selector(
+            SELECTORS.grid, 
+            timeout=Config.TIMEOUT_MS
         )
-        page: Page = await context.new_page()
         
-        try:
-            await page.goto(Config.QMC_URL, timeout=Config.TIMEOUT_MS)
-            
-            # Wait for grid
-            await page.wait_for_selector(
-                Config.SELECTORS["grid"], 
-                timeout=Config.TIMEOUT_MS
-            )
-            
-            # Extract table data using JavaScript
-            table_data = await page.evaluate("""
-                () => {
-                    const grid = document.querySelector('.qmc-grid');
-                    if (!grid) return null;
-                    
-                    const rows = [];
-                    const tableRows = grid.querySelectorAll('tbody tr, .grid-row');
-                    
-                    tableRows.forEach(row => {
-                        const cells = row.querySelectorAll('td, .grid-cell');
-                        const rowData = {};
-                        
-                        cells.forEach((cell, index) => {
-                            const header = cell.getAttribute('data-column') || 
-                                          document.querySelectorAll('th')[index]?.textContent?.trim() ||
-                                          `column_${index}`;
-                            rowData[header] = cell.textContent.trim();
-                        });
-                        
-                        if (Object.keys(rowData).length > 0) {
-                            rows.push(rowData);
-                        }
-                    });
-                    
-                    return JSON.stringify(rows, null, 2);
-                }
-            """)
-            
-            # Also get raw HTML as backup
-            grid_element = await page.query_selector(Config.SELECTORS["grid"])
-            raw_html = await grid_element.inner_html() if grid_element else ""
-            
-            # Combine into structured raw data
-            raw_table_data = f"""
+        # Single CDP round-trip: fetch the grid HTML and parse rows in Python
+        grid_element = await page.query_selector(SELECTORS.grid)
+        raw_html = await grid_element.inner_html() if grid_element else ""
+        rows = parse_grid_rows(raw_html) if raw_html else []
+        table_data = orjson.dumps(rows).decode() if rows else None
+        
+        # Combine into structured raw data
+        raw_table_data = f"""
 === EXTRACTED TABLE DATA ===
 {table_data if table_data else 'No structured data extracted'}
 
 === RAW HTML ===
 {raw_html[:5000] if raw_html else 'No HTML extracted'}
 """
-            
-            log_entry += f"\n  ✅ Extracted {len(raw_table_data)} chars of data"
-            
-            return {
-                "current_step": "analyze",
-                "raw_table_data": raw_table_data,
-                "error_message": None,
-                "logs": [log_entry]
-            }
-            
-        except Exception as e:
-            screenshot_path = f"error_extract_{state['retry_count']}_{datetime.now().strftime('%H%M%S')}.png"
-            await page.screenshot(path=screenshot_path)
-            
-            error_msg = str(e)
-            log_entry += f"\n  ❌ Error: {error_msg}"
-            
-            new_retry_count = state["retry_count"] + 1
-            
-            return {
-                "current_step": "error" if new_retry_count >= state["max_retries"] else "extract",
-                "retry_count": new_retry_count,
-                "error_message": error_msg,
-                "screenshots": [screenshot_path],
-                "logs": [log_entry]
-            }
-            
-        finally:
-            await browser.close()
+        
+        log_entry += f"\n  ✅ Extracted {len(raw_table_data)} chars of data"
+        
+        return {
+            "current_step": "analyze",
+            "raw_table_data": raw_table_data,
+            "error_message": None,
+            "logs": [log_entry]
+        }
+        
+    except Exception as e:
+        error_msg = str(e)
+        log_entry += f"\n  ❌ Error: {error_msg}"
+        
+        new_retry_count = state["retry_count"] + 1
+        retrying = new_retry_count < state["max_retries"]
+        
+        screenshot_path = None
+        if not retrying:
+            screenshot_path = await save_error_screenshot_async(page, "extract", state["retry_count"])
+        
+        return {
+            "current_step": "extract" if retrying else "error",
+            "retry_count": new_retry_count,
+            "error_message": error_msg,
+            "screenshots": [screenshot_path] if screenshot_path else [],
+            "logs": [log_entry]
+        }
+        
+    finally:
+        await page.close()
 
 
+def parse_grid_rows(grid_html: str) -> list:
+    """
+    Parse grid rows into dicts keyed by column header.
+    
+    Headers come from the cell's data-column attribute, then the matching
+    <th>, then a positional column_<i> name.
+    """
+    tree = LexborHTMLParser(grid_html)
+    headers = [th.text(strip=True) for th in tree.css("th")]
+    
+    rows = []
+    for tr in tree.css("tbody tr, .grid-row"):
+        row = {}
+        for i, cell in enumerate(tr.css("td, .grid-cell")):
+            header = cell.attributes.get("data-column") or (headers[i] if i < len(headers) else "") or f"column_{i}"
+            row[header] = cell.text(strip=True)
+        if row:
+            rows.append(row)
+    return rows
+
+
+# Retries re-send the same page_html; str hashes are cached, so hits are O(1)
+@lru_cache(maxsize=8)
 def extract_table_from_html(html: str) -> str:
     """
     Extract table content from full page HTML.
@@ -144,16 +162,12 @@ def extract_table_from_html(html: str) -> str:
         Table HTML or empty string
     """
     # Try to find qmc-grid content
-    patterns = [
-        r'<div[^>]*class="[^"]*qmc-grid[^"]*"[^>]*>(.*?)</div>',
-        r'<table[^>]*class="[^"]*qmc-grid[^"]*"[^>]*>(.*?)</table>',
-        r'<tbody[^>]*>(.*?)</tbody>'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
-        if match:
-            return match.group(0)
+    # Linear-time C parser instead of backtracking regexes over page HTML
+    tree = LexborHTMLParser(html)
+    for selector in _TABLE_SELECTORS:
+        node = tree.css_first(selector)
+        if node is not None:
+            return node.html
     
     # Return truncated HTML if no specific table found
     return html[:10000] if len(html) > 10000 else html
@@ -170,5 +184,6 @@ if __name__ == "__main__":
         print("Result keys:", result.keys())
         if result.get("raw_table_data"):
             print("Data length:", len(result["raw_table_data"]))
+        await close_all()
     
     asyncio.run(test_extract())
@@ -3,25 +3,33 @@ QMC Agent - Subprocess Extract Node
 Runs Playwright in a completely separate process to avoid asyncio conflicts in Jupyter.
 """
 
-import re
 from datetime import datetime
-from src.playwright_runner import run_playwright_script
+from functools import lru_cache
+from pathlib import Path
+from selectolax.lexbor import LexborHTMLParser
+from src.playwright_runner import get_worker
 from src.config import Config
 from src.state import QMCState
 
 
+# One long-lived Playwright process serves both filter and extract
+_WORKER_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "worker.py"
+
+
+# Table containers to look for, most specific first (substring class match)
+_TABLE_SELECTORS = ('div[class*="qmc-grid"]', 'table[class*="qmc-grid"]', 'tbody')
+
+
+# Retries re-send the same page_html; str hashes are cached, so hits are O(1)
+@lru_cache(maxsize=8)
 def extract_table_from_html(html: str) -> str:
     """Extract table content from full page HTML."""
-    patterns = [
-        r'<div[^>]*class="[^"]*qmc-grid[^"]*"[^>]*>(.*?)</div>',
-        r'<table[^>]*class="[^"]*qmc-grid[^"]*"[^>]*>(.*?)</table>',
-        r'<tbody[^>]*>(.*?)</tbody>'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, html, re.DOTALL | re.IGNORECASE)
-        if match:
-            return match.group(0)
+    # Linear-time C parser instead of backtracking regexes over page HTML
+    tree = LexborHTMLParser(html)
+    for selector in _TABLE_SELECTORS:
+        node = tree.css_first(selector)
+        if node is not None:
+            return node.html
     
     return html[:10000] if len(html) > 10000 else html
 
@@ -46,10 +54,11 @@ def extract_node_sync(state: QMCState) -> dict:
                 "logs": [log_entry]
             }
     
-    # Otherwise, run the extract script in subprocess
+    # Otherwise, extract in the shared Playwright worker
     args = {
         "url": Config.QMC_URL,
         "browser_state_path": state.get("browser_state_path"),
+        "storage_state": state.get("browser_storage_state"),
         "headless": Config.HEADLESS,
         "timeout": Config.TIMEOUT_MS,
         "selectors": Config.SELECTORS,
@@ -57,7 +66,7 @@ def extract_node_sync(state: QMCState) -> dict:
         "max_retries": state.get("max_retries", 3)
     }
     
-    result = run_playwright_script("extract_script.py", args)
+    result = get_worker(_WORKER_SCRIPT).call("extract", args)
     return result
 
 
@@ -4,12 +4,129 @@ Applies filters to QMC table: Last execution=Today, Tags=FE_HITOS
 """
 
 import asyncio
+import orjson
 from datetime import datetime
-from playwright.async_api import async_playwright, Page, Browser, BrowserContext
-from src.config import Config
+from typing import Dict, List, Optional
+from playwright.async_api import ElementHandle, Page, Response, TimeoutError as PlaywrightTimeoutError
+from src.legacy.browser_manager import close_all, get_context, keep_page, live_page, session_of
+from src.legacy.nodes.extract_node import parse_grid_rows
+from src.browser_utils import save_error_screenshot_async
+from src.config import Config, SELECTORS
 from src.state import QMCState
 
 
+# Upper bound for UI readiness waits (replaces the old fixed sleeps)
+_UI_WAIT_MS = 5000
+
+
+async def _wait_visible(page: Page, selector: str, timeout: int = _UI_WAIT_MS) -> Optional[ElementHandle]:
+    """
+    Wait until `selector` is visible and return its handle (None on timeout).
+    Reusing the handle saves the follow-up query_selector round-trip.
+    """
+    try:
+        return await page.wait_for_selector(selector, state="visible", timeout=timeout)
+    except PlaywrightTimeoutError:
+        return None
+
+
+def _is_tasks_response(response: Response) -> bool:
+    """True for the task-list XHR the grid is rendered from."""
+    return "task" in response.url.lower() and response.ok
+
+
+async def _click_and_wait_for_tasks(page: Page, action) -> None:
+    """Run a filter action and wait for the task-list response it triggers."""
+    try:
+        async with page.expect_response(_is_tasks_response, timeout=_UI_WAIT_MS):
+            await action()
+    except PlaywrightTimeoutError:
+        pass  # No reload seen; the grid wait in the caller still gates extraction
+
+
+async def _apply_last_execution(page: Page) -> str:
+    """Filter the grid to Last execution = Today; returns log lines."""
+    log_entry = ""
+    
+    # ============ FILTER 1: Last execution = Today ============
+    log_entry += "\n  Applying filter: Last execution = Today"
+    
+    # Try to click the filter icon for Last execution column
+    try:
+        # Wait for the column header instead of a fixed sleep
+        last_exec_filter = await _wait_visible(page, SELECTORS.last_execution_filter)
+        if last_exec_filter:
+            await last_exec_filter.click()
+            
+            # Select "Today" option once the dropdown shows it
+            today_option = await _wait_visible(page, SELECTORS.today_option)
+            if today_option:
+                await _click_and_wait_for_tasks(page, today_option.click)
+                log_entry += "\n    ✓ Selected 'Today'"
+            else:
+                # Try text-based selection
+                await _click_and_wait_for_tasks(page, page.locator("text=Today").first.click)
+                log_entry += "\n    ✓ Selected 'Today' (text match)"
+        else:
+            log_entry += "\n    ⚠ Could not find Last execution filter"
+            
+    except Exception as e:
+        log_entry += f"\n    ⚠ Filter 1 warning: {str(e)}"
+    
+    return log_entry
+
+
+async def _apply_tags(page: Page, tag: str) -> str:
+    """Filter the grid to rows tagged `tag`; returns log lines."""
+    log_entry = ""
+    
+    # ============ FILTER 2: Tags = FE_HITOS ============
+    log_entry += f"\n  Applying filter: Tags = {tag}"
+    
+    try:
+        # Click on Tags column filter
+        tags_filter = await _wait_visible(page, SELECTORS.tags_filter)
+        if tags_filter:
+            await tags_filter.click()
+            
+            # Search for FE_HITOS
+            tags_search = await _wait_visible(page, SELECTORS.tags_search)
+            if tags_search:
+                await tags_search.fill(tag)
+                
+                # Click apply or press Enter
+                apply_btn = page.locator(SELECTORS.apply_button).first
+                if await apply_btn.count():
+                    await _click_and_wait_for_tasks(page, apply_btn.click)
+                else:
+                    await _click_and_wait_for_tasks(page, lambda: tags_search.press("Enter"))
+                
+                log_entry += f"\n    ✓ Applied '{tag}' filter"
+            else:
+                log_entry += "\n    ⚠ Could not find tags search input"
+        else:
+            log_entry += "\n    ⚠ Could not find Tags filter"
+            
+    except Exception as e:
+        log_entry += f"\n    ⚠ Filter 2 warning: {str(e)}"
+    
+    return log_entry
+
+
+async def apply_filters(page: Page, tag: str = "FE_HITOS") -> str:
+    """
+    Apply the Last execution = Today and Tags filters on a page showing the grid.
+    
+    The two filters run one after the other: both open popovers on the same
+    grid header, and opening one closes the other. Use filter_many() to
+    overlap work across tags (one tab each).
+    
+    Returns:
+        Log lines describing what was applied
+    """
+    return await _apply_last_execution(page) + await _apply_tags(page, tag)
+
+
 async def filter_node(state: QMCState) -> dict:
     """
     Filter node: Applies filters to QMC task table.
@@ -19,146 +136,124 @@ async def filter_node(state: QMCState) -> dict:
     2. Tags = "FE_HITOS"
     
     Args:
-        state: Current workflow state (must have browser_state_path)
+        state: Current workflow state (browser_storage_state or browser_state_path)
         
     Returns:
-        Updated state dict with filtered page HTML or error info
+        Updated state dict with the filtered grid rows as JSON (raw_table_data) or error info
     """
     log_entry = f"[{datetime.now().isoformat()}] FILTER_NODE: Applying filters"
     
-    async with async_playwright() as p:
-        browser: Browser = await p.chromium.launch(headless=Config.HEADLESS)
-        
-        # Restore session from saved state
-        context: BrowserContext = await browser.new_context(
-            storage_state=state.get("browser_state_path")
-        )
-        page: Page = await context.new_page()
-        
-        try:
+    session, storage_state = session_of(state)
+    kept = False
+    
+    # Continue on the logged-in page if login left one open
+    page = live_page(session)
+    fresh = page is None
+    if fresh:
+        # Restore session from saved state (shared browser, new tab)
+        context = await get_context(storage_state, session=session)
+        page = await context.new_page()
+    
+    try:
+        if fresh:
             # Navigate to QMC tasks
             log_entry += f"\n  Navigating to {Config.QMC_URL}"
             await page.goto(Config.QMC_URL, timeout=Config.TIMEOUT_MS)
             
             # Wait for grid to be visible
             await page.wait_for_selector(
-                Config.SELECTORS["grid"], 
+                SELECTORS.grid, 
                 timeout=Config.TIMEOUT_MS
             )
             log_entry += "\n  Grid loaded"
-            
-            # ============ FILTER 1: Last execution = Today ============
-            log_entry += "\n  Applying filter: Last execution = Today"
-            
-            # Try to click the filter icon for Last execution column
-            try:
-                # Wait a bit for dynamic elements
-                await page.wait_for_timeout(1000)
-                
-                # Click on Last execution column header/filter
-                last_exec_filter = await page.query_selector(
-                    Config.SELECTORS["last_execution_filter"]
-                )
-                if last_exec_filter:
-                    await last_exec_filter.click()
-                    await page.wait_for_timeout(500)
-                    
-                    # Select "Today" option
-                    today_option = await page.query_selector(
-                        Config.SELECTORS["today_option"]
-                    )
-                    if today_option:
-                        await today_option.click()
-                        log_entry += "\n    ✓ Selected 'Today'"
-                    else:
-                        # Try text-based selection
-                        await page.click("text=Today")
-                        log_entry += "\n    ✓ Selected 'Today' (text match)"
-                else:
-                    log_entry += "\n    ⚠ Could not find Last execution filter"
-                    
-            except Exception as e:
-                log_entry += f"\n    ⚠ Filter 1 warning: {str(e)}"
-            
-            # ============ FILTER 2: Tags = FE_HITOS ============
-            log_entry += "\n  Applying filter: Tags = FE_HITOS_DIARIO"
-            
-            try:
-                await page.wait_for_timeout(1000)
-                
-                # Click on Tags column filter
-                tags_filter = await page.query_selector(
-                    Config.SELECTORS["tags_filter"]
-                )
-                if tags_filter:
-                    await tags_filter.click()
-                    await page.wait_for_timeout(500)
-                    
-                    # Search for FE_HITOS
-                    tags_search = await page.query_selector(
-                        Config.SELECTORS["tags_search"]
-                    )
-                    if tags_search:
-                        await tags_search.fill("FE_HITOS")
-                        await page.wait_for_timeout(500)
-                        
-                        # Click apply or press Enter
-                        apply_btn = await page.query_selector(
-                            Config.SELECTORS["apply_button"]
-                        )
-                        if apply_btn:
-                            await apply_btn.click()
-                        else:
-                            await tags_search.press("Enter")
-                        
-                        log_entry += "\n    ✓ Applied 'FE_HITOS_DIARIO' filter"
-                    else:
-                        log_entry += "\n    ⚠ Could not find tags search input"
-                else:
-                    log_entry += "\n    ⚠ Could not find Tags filter"
-                    
-            except Exception as e:
-                log_entry += f"\n    ⚠ Filter 2 warning: {str(e)}"
-            
-            # Wait for filtered results
-            await page.wait_for_timeout(2000)
-            await page.wait_for_selector(
-                Config.SELECTORS["grid"], 
-                timeout=Config.TIMEOUT_MS
-            )
-            
-            # Get page HTML
-            page_html = await page.content()
-            
-            log_entry += "\n  ✅ Filters applied successfully!"
-            
+        else:
+            log_entry += "\n  Reusing logged-in page (grid already loaded)"
+        
+        log_entry += await apply_filters(page)
+        
+        # Wait for filtered results
+        await page.wait_for_selector(
+            SELECTORS.grid, 
+            timeout=Config.TIMEOUT_MS
+        )
+        
+        log_entry += "\n  ✅ Filters applied successfully!"
+        
+        # Hand the rows straight to analyze (no full-page HTML, no extract step),
+        # as the header-keyed JSON rows analyst_node_sync parses
+        grid = page.locator(SELECTORS.grid).first
+        rows = parse_grid_rows(await grid.inner_html()) if await grid.count() else []
+        if rows:
+            log_entry += f"\n  ✅ Extracted {len(rows)} rows"
             return {
-                "current_step": "extract",
-                "page_html": page_html,
+                "current_step": "analyze",
+                "raw_table_data": orjson.dumps(rows).decode(),
                 "error_message": None,
                 "logs": [log_entry]
             }
-            
-        except Exception as e:
-            # Capture screenshot on error
-            screenshot_path = f"error_filter_{state['retry_count']}_{datetime.now().strftime('%H%M%S')}.png"
-            await page.screenshot(path=screenshot_path)
-            
-            error_msg = str(e)
-            log_entry += f"\n  ❌ Error: {error_msg}"
-            
-            new_retry_count = state["retry_count"] + 1
-            
-            return {
-                "current_step": "error" if new_retry_count >= state["max_retries"] else "filter",
-                "retry_count": new_retry_count,
-                "error_message": error_msg,
-                "screenshots": [screenshot_path],
-                "logs": [log_entry]
-            }
-            
-        finally:
-            await browser.close()
+        
+        # Grid not found: fall back to the page HTML, extract continues on this page
+        page_html = await page.content()
+        await keep_page(session, page)
+        kept = True
+        
+        return {
+            "current_step": "extract",
+            "page_html": page_html,
+            "error_message": None,
+            "logs": [log_entry]
+        }
+        
+    except Exception as e:
+        error_msg = str(e)
+        log_entry += f"\n  ❌ Error: {error_msg}"
+        
+        new_retry_count = state["retry_count"] + 1
+        
+        screenshot_path = None
+        if new_retry_count >= state["max_retries"]:
+            screenshot_path = await save_error_screenshot_async(page, "filter", state["retry_count"])
+        
+        return {
+            "current_step": "error" if new_retry_count >= state["max_retries"] else "filter",
+            "retry_count": new_retry_count,
+            "error_message": error_msg,
+            "screenshots": [screenshot_path] if screenshot_path else [],
+            "logs": [log_entry]
+        }
+        
+    finally:
+        if not kept:
+            await page.close()
+
+
+async def filter_many(state: QMCState, tags: List[str], max_concurrent: int = 4) -> Dict[str, str]:
+    """
+    Filter several tags in parallel, one tab per tag in the shared context.
+    
+    At most `max_concurrent` tabs are open at once, so a long tag list
+    does not flood QMC with simultaneous grid loads.
+    
+    Returns:
+        Filtered page HTML per tag
+    """
+    session, storage_state = session_of(state)
+    context = await get_context(storage_state, session=session)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def _filter_one(tag: str):
+        async with semaphore:
+            page = await context.new_page()
+            try:
+                await page.goto(Config.QMC_URL, timeout=Config.TIMEOUT_MS)
+                await page.wait_for_selector(SELECTORS.grid, timeout=Config.TIMEOUT_MS)
+                await apply_filters(page, tag)
+                await page.wait_for_selector(SELECTORS.grid, timeout=Config.TIMEOUT_MS)
+                return tag, await page.content()
+            finally:
+                await page.close()
+    
+    return dict(await asyncio.gather(*[_filter_one(t) for t in tags]))
 
 
 # For testing in isolation
@@ -170,5 +265,6 @@ if __name__ == "__main__":
         state["browser_state_path"] = "browser_state.json"
         result = await filter_node(state)
         print("Result keys:", result.keys())
+        await close_all()
     
     asyncio.run(test_filter())
@@ -5,11 +5,16 @@ Now extracts data directly - filtering is delegated to the LLM.
 """
 
 from datetime import datetime
-from src.playwright_runner import run_playwright_script
+from pathlib import Path
+from src.playwright_runner import get_worker
 from src.config import Config
 from src.state import QMCState
 
 
+# One long-lived Playwright process serves both filter and extract
+_WORKER_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "worker.py"
+
+
 def filter_node_sync(state: QMCState) -> dict:
     """
     Filter node (subprocess version): Navigates to QMC and extracts table data.
@@ -19,6 +24,7 @@ def filter_node_sync(state: QMCState) -> dict:
     args = {
         "url": Config.QMC_URL,
         "browser_state_path": state.get("browser_state_path"),
+        "storage_state": state.get("browser_storage_state"),
         "headless": Config.HEADLESS,
         "timeout": Config.TIMEOUT_MS,
         "selectors": Config.SELECTORS,
@@ -26,7 +32,7 @@ def filter_node_sync(state: QMCState) -> dict:
         "max_retries": state.get("max_retries", 3)
     }
     
-    result = run_playwright_script("filter_script.py", args)
+    result = get_worker(_WORKER_SCRIPT).call("filter", args)
     
     # If we got raw_table_data, we can skip the extract step and go directly to analyze
     if result.get("raw_table_data"):
@@ -2,13 +2,201 @@
 QMC Filter Debug Script - With Login
 This script runs with headless=False to help identify the correct filter selectors.
 Run this directly: python src/scripts/debug_filters.py
+Re-inspect the last session offline: python src/scripts/debug_filters.py --replay
 """
 
 import json
 import sys
 import time
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+
+# Debug artifacts: Playwright trace of the live session and the page HTML
+# that --replay re-inspects offline
+TRACE_PATH = "qmc_debug.zip"
+SNAPSHOT_PATH = "debug_page.html"
+
+# Filter popover opened by clicking a column header
+FILTER_POPOVER = ".qmc-filter-popup, .lui-popover"
+
+
+def wait_visible(page, selector: str, timeout: int = 5000) -> bool:
+    """Wait until `selector` is visible; False on timeout instead of raising."""
+    try:
+        page.wait_for_selector(selector, state="visible", timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def snap(page, name: str, target=None) -> str:
+    """Save a viewport (or `target` element) screenshot as a small JPEG; returns the path."""
+    path = f"{name}.jpg"
+    (target or page).screenshot(path=path, type="jpeg", quality=60)
+    return path
+
+
+def describe_selectors(page, selectors: list, limit: int = 5) -> dict:
+    """
+    Match several CSS selectors in one evaluate (one round-trip instead of
+    one query_selector_all per selector).
+    
+    Returns:
+        {selector: {"count": n, "items": [{tag, cls, ph, text}, ...]}} for the first `limit` matches
+    """
+    return page.evaluate("""
+        ([selectors, limit]) => Object.fromEntries(selectors.map(sel => {
+            const els = Array.from(document.querySelectorAll(sel));
+            return [sel, {
+                count: els.length,
+                items: els.slice(0, limit).map(el => ({
+                    tag: el.tagName,
+                    cls: el.getAttribute('class') || '',
+                    ph: el.getAttribute('placeholder') || '',
+                    text: (el.innerText || '').trim().replace(/\\n/g, ' ').slice(0, 40)
+                }))
+            }];
+        }))
+    """, [selectors, limit])
+
+
+def inspect_page(page):
+    """Steps 4-9: list headers, filter UI elements and save the table HTML."""
+    # Step 4: Find column headers
+    print("\n[4] Searching for column headers...")
+    
+    # Try multiple header selectors
+    header_selectors = [
+        "th",
+        "thead td",
+        ".header-cell",
+        "[class*='header']",
+        "[role='columnheader']"
+    ]
+    
+    for sel, found in describe_selectors(page, header_selectors, limit=12).items():
+        if found["count"]:
+            print(f"\n    Found {found['count']} headers with selector: {sel}")
+            for i, h in enumerate(found["items"]):
+                print(f"      [{i}] '{h['text']}' class='{h['cls'][:40]}'")
+    
+    # Step 5: Look for "Last execution" header and click
+    print("\n[5] Looking for 'Last execution' column...")
+    
+    # Try to find by text content
+    last_exec = page.query_selector("th:has-text('Last execution')")
+    if not last_exec:
+        last_exec = page.query_selector("td:has-text('Last execution')")
+    if not last_exec:
+        # Try text locator
+        last_exec = page.locator("text=Last execution").first
+        if last_exec.count() == 0:
+            last_exec = None
+    
+    if last_exec:
+        print("    Found 'Last execution'!")
+        # Get parent to find the clickable header
+        try:
+            last_exec.click()
+            print("    Clicked on 'Last execution' header")
+            if not wait_visible(page, FILTER_POPOVER):
+                print("    No filter popover appeared")
+            print(f"    Screenshot: {snap(page, 'debug_04_last_exec_clicked')}")
+        except Exception as e:
+            print(f"    Click failed: {e}")
+    else:
+        print("    'Last execution' not found")
+    
+    # Step 6: Look for Tags column and click
+    print("\n[6] Looking for 'Tags' column...")
+    tags = page.query_selector("th:has-text('Tags')")
+    if not tags:
+        tags = page.locator("text=Tags").first
+        if tags.count() == 0:
+            tags = None
+    
+    if tags:
+        print("    Found 'Tags'!")
+        try:
+            tags.click()
+            print("    Clicked on 'Tags' header")
+            if not wait_visible(page, FILTER_POPOVER):
+                print("    No filter popover appeared")
+            print(f"    Screenshot: {snap(page, 'debug_05_tags_clicked')}")
+        except Exception as e:
+            print(f"    Click failed: {e}")
+    else:
+        print("    'Tags' not found")
+    
+    # Step 7: Look for filter/search UI elements
+    print("\n[7] Looking for filter UI elements...")
+    
+    filter_selectors = [
+        "input[type='search']",
+        "input[placeholder*='search']",
+        "input[placeholder*='filter']",
+        "[class*='filter']",
+        "[class*='Filter']",
+        ".lui-search",
+        ".lui-icon--search",
+        ".lui-filterbox"
+    ]
+    
+    for sel, found in describe_selectors(page, filter_selectors).items():
+        if found["count"]:
+            print(f"    Found {found['count']} elements for: {sel}")
+            for i, el in enumerate(found["items"]):
+                print(f"      [{i}] <{el['tag']}> class='{el['cls'][:40]}' placeholder='{el['ph']}'")
+    
+    # Step 8: Look for dropdown/menu elements
+    print("\n[8] Looking for dropdowns/menus...")
+    dropdown_selectors = [
+        ".dropdown",
+        ".menu", 
+        "[class*='popup']",
+        "[class*='Popup']",
+        ".lui-popover",
+        ".lui-menu"
+    ]
+    
+    for sel, found in describe_selectors(page, dropdown_selectors, limit=0).items():
+        if found["count"]:
+            print(f"    Found {found['count']} elements for: {sel}")
+    
+    # Step 9: Get HTML structure of header row
+    print("\n[9] Capturing HTML structure...")
+    try:
+        thead = page.query_selector("thead")
+        if thead:
+            html = thead.inner_html()
+            with open("debug_thead.html", "w", encoding="utf-8") as f:
+                f.write(html)
+            print("    Saved thead to: debug_thead.html")
+        
+        # Also get any row to see structure
+        first_row = page.query_selector("tbody tr")
+        if first_row:
+            html = first_row.inner_html()
+            with open("debug_row.html", "w", encoding="utf-8") as f:
+                f.write(html)
+            print("    Saved first row to: debug_row.html")
+    except Exception as e:
+        print(f"    Error capturing HTML: {e}")
+
+
+def replay():
+    """Re-run steps 4-9 offline against the saved snapshot (no network, no login)."""
+    with open(SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+        html = f.read()
+    
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page(viewport={"width": 1920, "height": 1080})
+        try:
+            page.set_content(html)
+            inspect_page(page)
+        finally:
+            browser.close()
 
 
 def main():
@@ -33,15 +221,17 @@ def main():
         # Launch visible browser
         browser = p.chromium.launch(headless=False, slow_mo=300)
         context = browser.new_context(viewport={"width": 1920, "height": 1080})
+        # Full trace for later inspection: playwright show-trace qmc_debug.zip
+        context.tracing.start(screenshots=True, snapshots=True, sources=True)
         page = context.new_page()
         
         try:
             # Step 1: Navigate
             print("\n[1] Navigating to QMC...")
-            page.goto(url, wait_until="networkidle", timeout=60000)
-            page.wait_for_timeout(2000)
-            page.screenshot(path="debug_01_initial.png")
-            print("    Screenshot: debug_01_initial.png")
+            page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            # Ready once the SPA shows either the login form or the grid
+            wait_visible(page, "input[placeholder*='user'], input[name='username'], table, tbody", timeout=60000)
+            print(f"    Screenshot: {snap(page, 'debug_01_initial')}")
             
             # Step 2: Login if needed
             print("\n[2] Checking if login is needed...")
@@ -64,158 +254,37 @@ def main():
                     password_input.press("Enter")
                 
                 print("    Waiting for login to complete...")
-                page.wait_for_timeout(5000)
-                page.screenshot(path="debug_02_after_login.png")
-                print("    Screenshot: debug_02_after_login.png")
+                try:
+                    page.wait_for_selector("input[type='password']", state="detached", timeout=15000)
+                except PlaywrightTimeoutError:
+                    print("    Login form still present after 15s")
+                print(f"    Screenshot: {snap(page, 'debug_02_after_login')}")
             else:
                 print("    No login form, already authenticated")
             
             # Step 3: Wait for table to load
             print("\n[3] Waiting for table to load...")
-            page.wait_for_timeout(5000)
-            page.screenshot(path="debug_03_table_loading.png")
-            print("    Screenshot: debug_03_table_loading.png")
+            if not wait_visible(page, "table, tbody, [class*='grid']", timeout=60000):
+                print("    No table/grid became visible")
+            print(f"    Screenshot: {snap(page, 'debug_03_table_loading')}")
             
             # Try to find the table
             table_selectors = ["table", "tbody", "[class*='grid']", "[class*='table']", "[class*='list']"]
-            for sel in table_selectors:
-                elements = page.query_selector_all(sel)
-                if elements:
-                    print(f"    Found {len(elements)} elements for: {sel}")
-            
-            # Step 4: Find column headers
-            print("\n[4] Searching for column headers...")
-            
-            # Try multiple header selectors
-            header_selectors = [
-                "th",
-                "thead td",
-                ".header-cell",
-                "[class*='header']",
-                "[role='columnheader']"
-            ]
-            
-            for sel in header_selectors:
-                headers = page.query_selector_all(sel)
-                if headers:
-                    print(f"\n    Found {len(headers)} headers with selector: {sel}")
-                    for i, h in enumerate(headers[:12]):
-                        text = h.inner_text().strip().replace("\n", " ")[:40]
-                        classes = h.get_attribute("class") or ""
-                        print(f"      [{i}] '{text}' class='{classes[:40]}'")
-            
-            # Step 5: Look for "Last execution" header and click
-            print("\n[5] Looking for 'Last execution' column...")
+            for sel, found in describe_selectors(page, table_selectors, limit=0).items():
+                if found["count"]:
+                    print(f"    Found {found['count']} elements for: {sel}")
             
-            # Try to find by text content
-            last_exec = page.query_selector("th:has-text('Last execution')")
-            if not last_exec:
-                last_exec = page.query_selector("td:has-text('Last execution')")
-            if not last_exec:
-                # Try text locator
-                last_exec = page.locator("text=Last execution").first
-                if last_exec.count() == 0:
-                    last_exec = None
+            # Keep the loaded page so steps 4-9 can be replayed offline (--replay)
+            with open(SNAPSHOT_PATH, "w", encoding="utf-8") as f:
+                f.write(page.content())
+            print(f"    Saved page snapshot to: {SNAPSHOT_PATH}")
             
-            if last_exec:
-                print("    Found 'Last execution'!")
-                # Get parent to find the clickable header
-                try:
-                    last_exec.click()
-                    print("    Clicked on 'Last execution' header")
-                    page.wait_for_timeout(2000)
-                    page.screenshot(path="debug_04_last_exec_clicked.png")
-                    print("    Screenshot: debug_04_last_exec_clicked.png")
-                except Exception as e:
-                    print(f"    Click failed: {e}")
-            else:
-                print("    'Last execution' not found")
-            
-            # Step 6: Look for Tags column and click
-            print("\n[6] Looking for 'Tags' column...")
-            tags = page.query_selector("th:has-text('Tags')")
-            if not tags:
-                tags = page.locator("text=Tags").first
-                if tags.count() == 0:
-                    tags = None
-            
-            if tags:
-                print("    Found 'Tags'!")
-                try:
-                    tags.click()
-                    print("    Clicked on 'Tags' header")
-                    page.wait_for_timeout(2000)
-                    page.screenshot(path="debug_05_tags_clicked.png")
-                    print("    Screenshot: debug_05_tags_clicked.png")
-                except Exception as e:
-                    print(f"    Click failed: {e}")
-            else:
-                print("    'Tags' not found")
-            
-            # Step 7: Look for filter/search UI elements
-            print("\n[7] Looking for filter UI elements...")
-            
-            filter_selectors = [
-                "input[type='search']",
-                "input[placeholder*='search']",
-                "input[placeholder*='filter']",
-                "[class*='filter']",
-                "[class*='Filter']",
-                ".lui-search",
-                ".lui-icon--search",
-                ".lui-filterbox"
-            ]
-            
-            for sel in filter_selectors:
-                elements = page.query_selector_all(sel)
-                if elements:
-                    print(f"    Found {len(elements)} elements for: {sel}")
-                    for i, el in enumerate(elements[:5]):
-                        classes = el.get_attribute("class") or ""
-                        placeholder = el.get_attribute("placeholder") or ""
-                        tag = el.evaluate("el => el.tagName")
-                        print(f"      [{i}] <{tag}> class='{classes[:40]}' placeholder='{placeholder}'")
-            
-            # Step 8: Look for dropdown/menu elements
-            print("\n[8] Looking for dropdowns/menus...")
-            dropdown_selectors = [
-                ".dropdown",
-                ".menu", 
-                "[class*='popup']",
-                "[class*='Popup']",
-                ".lui-popover",
-                ".lui-menu"
-            ]
-            
-            for sel in dropdown_selectors:
-                elements = page.query_selector_all(sel)
-                if elements:
-                    print(f"    Found {len(elements)} elements for: {sel}")
-            
-            # Step 9: Get HTML structure of header row
-            print("\n[9] Capturing HTML structure...")
-            try:
-                thead = page.query_selector("thead")
-                if thead:
-                    html = thead.inner_html()
-                    with open("debug_thead.html", "w", encoding="utf-8") as f:
-                        f.write(html)
-                    print("    Saved thead to: debug_thead.html")
-                
-                # Also get any row to see structure
-                first_row = page.query_selector("tbody tr")
-                if first_row:
-                    html = first_row.inner_html()
-                    with open("debug_row.html", "w", encoding="utf-8") as f:
-                        f.write(html)
-                    print("    Saved first row to: debug_row.html")
-            except Exception as e:
-                print(f"    Error capturing HTML: {e}")
+            inspect_page(page)
             
             # Step 10: Final screenshot
             print("\n[10] Taking final screenshot...")
-            page.screenshot(path="debug_10_final.png", full_page=True)
-            print("    Screenshot: debug_10_final.png")
+            table = page.locator("table").first
+            print(f"    Screenshot: {snap(page, 'debug_10_final', table if table.count() else None)}")
             
             print("\n" + "=" * 60)
             print("DEBUG COMPLETE")
@@ -234,11 +303,15 @@ def main():
             print(f"\nError: {e}")
             import traceback
             traceback.print_exc()
-            page.screenshot(path="debug_error.png")
-            print("Error screenshot: debug_error.png")
+            print(f"Error screenshot: {snap(page, 'debug_error')}")
         finally:
+            context.tracing.stop(path=TRACE_PATH)
+            print(f"Trace saved: {TRACE_PATH} (playwright show-trace {TRACE_PATH})")
             browser.close()
 
 
 if __name__ == "__main__":
-    main()
+    if "--replay" in sys.argv:
+        replay()
+    else:
+        main()
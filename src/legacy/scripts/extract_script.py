@@ -4,26 +4,55 @@ This script runs in a separate process to avoid asyncio conflicts.
 Usage: python extract_script.py '{"url": "...", "browser_state_path": "...", ...}'
 """
 
+import hashlib
 import json
 import sys
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+from typing import List, Optional
+import orjson
+from src.browser_utils import block_assets, save_error_screenshot
 
+# Last extraction per snapshot key, as (fingerprint, raw_table_data); lives as long as the worker
+_snapshots = {}
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"success": False, "error": "No arguments provided"}))
-        sys.exit(1)
-    
-    try:
-        args = json.loads(sys.argv[1])
-    except json.JSONDecodeError as e:
-        print(json.dumps({"success": False, "error": f"Invalid JSON arguments: {e}"}))
-        sys.exit(1)
-    
+# Headers and the text of every row, in one evaluate (no per-cell work)
+FINGERPRINT_JS = """
+    (grid) => ({
+        heads: Array.from(document.querySelectorAll('th'), th => th.textContent.trim()),
+        rows: Array.from(grid.querySelectorAll('tbody tr, .grid-row'), r => r.textContent.trim())
+    })
+"""
+
+
+def grid_fingerprint(heads: List[str], rows: List[str]) -> str:
+    """Digest of the headers and every row's text: any status change misses the cache."""
+    digest = hashlib.sha1("|".join(heads).encode())
+    for row in rows:
+        digest.update(b"\n" + row.encode())
+    return digest.hexdigest()
+
+
+def snapshot_key(args: dict) -> str:
+    """Cache key of an extraction: URL, grid selector and the filters applied to it."""
+    return orjson.dumps(
+        [args.get("url"), args.get("selectors", {}).get("grid"), args.get("filters")],
+        default=dict, option=orjson.OPT_SORT_KEYS
+    ).decode()
+
+
+def cached_extraction(key: str, fingerprint: str) -> Optional[str]:
+    """Return the stored raw_table_data if the grid is unchanged since it was taken."""
+    cached = _snapshots.get(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    return None
+
+
+def run(browser, args: dict) -> dict:
+    """Extract the QMC grid in a new context of an already launched `browser`."""
     url = args.get("url")
-    browser_state_path = args.get("browser_state_path")
-    headless = args.get("headless", True)
+    # An in-memory storage_state dict (from login) wins over the state file
+    storage_state = args.get("storage_state") or args.get("browser_state_path")
     timeout = args.get("timeout", 30000)
     selectors = args.get("selectors", {})
     retry_count = args.get("retry_count", 0)
@@ -31,95 +60,128 @@ def main():
     
     log_entry = f"[{datetime.now().isoformat()}] EXTRACT_SCRIPT: Extracting table data"
     
+    context = browser.new_context(storage_state=storage_state)
+    context.route("**/*", block_assets)
+    page = context.new_page()
+    
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless)
-            context = browser.new_context(storage_state=browser_state_path)
-            page = context.new_page()
-            
-            try:
-                page.goto(url, timeout=timeout)
+        page.goto(url, timeout=timeout)
+        
+        grid_selector = selectors.get("grid", ".qmc-grid")
+        page.wait_for_selector(grid_selector, timeout=timeout)
+        
+        # Unchanged grid since the last poll: reuse that extraction (one small evaluate)
+        grid = page.locator(grid_selector).first
+        summary = grid.evaluate(FINGERPRINT_JS)
+        fingerprint = grid_fingerprint(summary["heads"], summary["rows"])
+        key = snapshot_key(args)
+        cached = cached_extraction(key, fingerprint)
+        if cached is not None:
+            log_entry += "\n  Grid unchanged since last extraction, reusing it"
+            return {
+                "success": True,
+                "current_step": "analyze",
+                "raw_table_data": cached,
+                "error_message": None,
+                "logs": [log_entry]
+            }
+        
+        # One evaluate on the grid: rows plus the raw HTML preview (no second round-trip)
+        extracted = grid.evaluate("""
+            (grid) => {
+                // Read the headers once instead of re-querying them per cell
+                const ths = Array.from(document.querySelectorAll('th'), th => th.textContent.trim());
+                const rows = [];
+                const tableRows = grid.querySelectorAll('tbody tr, .grid-row');
                 
-                grid_selector = selectors.get("grid", ".qmc-grid")
-                page.wait_for_selector(grid_selector, timeout=timeout)
-                
-                # Extract table data using JavaScript
-                table_data = page.evaluate("""
-                    () => {
-                        const grid = document.querySelector('.qmc-grid');
-                        if (!grid) return null;
-                        
-                        const rows = [];
-                        const tableRows = grid.querySelectorAll('tbody tr, .grid-row');
-                        
-                        tableRows.forEach(row => {
-                            const cells = row.querySelectorAll('td, .grid-cell');
-                            const rowData = {};
-                            
-                            cells.forEach((cell, index) => {
-                                const header = cell.getAttribute('data-column') || 
-                                              document.querySelectorAll('th')[index]?.textContent?.trim() ||
-                                              `column_${index}`;
-                                rowData[header] = cell.textContent.trim();
-                            });
-                            
-                            if (Object.keys(rowData).length > 0) {
-                                rows.push(rowData);
-                            }
-                        });
-                        
-                        return JSON.stringify(rows, null, 2);
+                for (const row of tableRows) {
+                    const cells = row.querySelectorAll('td, .grid-cell');
+                    const rowData = {};
+                    
+                    for (let index = 0; index < cells.length; index++) {
+                        const cell = cells[index];
+                        const header = cell.getAttribute('data-column') || 
+                                      ths[index] ||
+                                      `column_${index}`;
+                        rowData[header] = cell.textContent.trim();
                     }
-                """)
-                
-                # Get raw HTML as backup
-                grid_element = page.query_selector(grid_selector)
-                raw_html = grid_element.inner_html() if grid_element else ""
+                    
+                    if (cells.length > 0) {
+                        rows.push(rowData);
+                    }
+                }
                 
-                raw_table_data = f"""
+                return { rows, htmlPreview: grid.innerHTML.slice(0, 5000) };
+            }
+        """)
+        rows = extracted["rows"]
+        raw_html = extracted["htmlPreview"]
+        table_data = orjson.dumps(rows).decode() if rows else None
+        
+        raw_table_data = f"""
 === EXTRACTED TABLE DATA ===
 {table_data if table_data else 'No structured data extracted'}
 
 === RAW HTML ===
-{raw_html[:5000] if raw_html else 'No HTML extracted'}
+{raw_html if raw_html else 'No HTML extracted'}
 """
-                
-                log_entry += f"\n  Extracted {len(raw_table_data)} chars of data"
-                
-                result = {
-                    "success": True,
-                    "current_step": "analyze",
-                    "raw_table_data": raw_table_data,
-                    "error_message": None,
-                    "logs": [log_entry]
-                }
-                print(json.dumps(result))
-                
-            except Exception as e:
-                screenshot_path = f"error_extract_{retry_count}_{datetime.now().strftime('%H%M%S')}.png"
-                try:
-                    page.screenshot(path=screenshot_path)
-                except:
-                    screenshot_path = None
-                
-                error_msg = str(e)
-                log_entry += f"\n  Error: {error_msg}"
-                
-                new_retry_count = retry_count + 1
-                
-                result = {
-                    "success": False,
-                    "current_step": "error" if new_retry_count >= max_retries else "extract",
-                    "retry_count": new_retry_count,
-                    "error_message": error_msg,
-                    "screenshots": [screenshot_path] if screenshot_path else [],
-                    "logs": [log_entry]
-                }
-                print(json.dumps(result))
-                
+        
+        log_entry += f"\n  Extracted {len(raw_table_data)} chars of data"
+        _snapshots[key] = (fingerprint, raw_table_data)
+        
+        return {
+            "success": True,
+            "current_step": "analyze",
+            "raw_table_data": raw_table_data,
+            "error_message": None,
+            "logs": [log_entry]
+        }
+        
+    except Exception as e:
+        error_msg = str(e)
+        log_entry += f"\n  Error: {error_msg}"
+        
+        new_retry_count = retry_count + 1
+        
+        screenshot_path = None
+        if new_retry_count >= max_retries:
+            screenshot_path = save_error_screenshot(page, "extract", retry_count)
+        
+        return {
+            "success": False,
+            "current_step": "error" if new_retry_count >= max_retries else "extract",
+            "retry_count": new_retry_count,
+            "error_message": error_msg,
+            "screenshots": [screenshot_path] if screenshot_path else [],
+            "logs": [log_entry]
+        }
+        
+    finally:
+        context.close()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(json.dumps({"success": False, "error": "No arguments provided"}))
+        sys.exit(1)
+    
+    try:
+        args = json.loads(sys.argv[1])
+    except json.JSONDecodeError as e:
+        print(json.dumps({"success": False, "error": f"Invalid JSON arguments: {e}"}))
+        sys.exit(1)
+    
+    from playwright.sync_api import sync_playwright
+    
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=args.get("headless", True))
+            try:
+                result = run(browser, args)
             finally:
                 browser.close()
-                
+        print(json.dumps(result))
+        
     except Exception as e:
         result = {
             "success": False,
@@ -7,7 +7,33 @@ Usage: python filter_script.py '{"url": "...", "browser_state_path": "...", ...}
 import json
 import sys
 from datetime import datetime
-from playwright.sync_api import sync_playwright
+import orjson
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from src.browser_utils import block_assets
+
+# Upper bound for UI readiness waits (replaces the old fixed sleeps)
+UI_WAIT_MS = 5000
+
+# Filter popover opened by a column's filter button
+FILTER_POPOVER = ".qmc-filter-popup, .lui-popover"
+
+
+def wait_visible(page, selector: str, timeout: int = UI_WAIT_MS) -> bool:
+    """Wait until `selector` is visible; False on timeout instead of raising."""
+    try:
+        page.wait_for_selector(selector, state="visible", timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def click_and_wait_for_tasks(page, target) -> None:
+    """Click `target` and wait for the task-list response the grid reloads from."""
+    try:
+        with page.expect_response(lambda r: "task" in r.url.lower() and r.ok, timeout=UI_WAIT_MS):
+            target.click()
+    except PlaywrightTimeoutError:
+        pass  # No reload seen; the row wait in run() still gates extraction
 
 
 def apply_tags_filter(page, tag_value: str, log_entries: list) -> bool:
@@ -17,24 +43,21 @@ def apply_tags_filter(page, tag_value: str, log_entries: list) -> bool:
         tags_header = page.locator("th.column").filter(has_text="Tags").first
         tags_header.locator(".qmc-filter-button button").click()
         log_entries.append(f"Clicked Tags filter")
-        page.wait_for_timeout(1000)
+        wait_visible(page, FILTER_POPOVER)
         
         # Type in search input and click the matching option
         search_input = page.locator("input").first
         search_input.fill(tag_value)
         log_entries.append(f"Typed '{tag_value}'")
-        page.wait_for_timeout(800)
         
-        # Click checkbox to select
-        checkbox = page.locator("input[type='checkbox']").first
-        if checkbox.is_visible():
-            checkbox.click()
+        # Click checkbox to select (waits for the search results to render)
+        if wait_visible(page, "input[type='checkbox']"):
+            click_and_wait_for_tasks(page, page.locator("input[type='checkbox']").first)
             log_entries.append("Selected checkbox")
         else:
-            page.locator(f"text={tag_value}").first.click()
+            click_and_wait_for_tasks(page, page.locator(f"text={tag_value}").first)
             log_entries.append("Clicked option text")
         
-        page.wait_for_timeout(1500)
         return True
     except Exception as e:
         log_entries.append(f"Tags filter error: {str(e)}")
@@ -48,12 +71,11 @@ def apply_date_filter(page, date_option: str, log_entries: list) -> bool:
         last_exec_header = page.locator("th.column").filter(has_text="Last execution").first
         last_exec_header.locator(".qmc-filter-button button").click()
         log_entries.append(f"Clicked Last execution filter")
-        page.wait_for_timeout(1000)
+        wait_visible(page, FILTER_POPOVER)
         
         # Click date option (e.g., "Today")
-        page.locator(f"text={date_option}").first.click()
+        click_and_wait_for_tasks(page, page.locator(f"text={date_option}").first)
         log_entries.append(f"Selected '{date_option}'")
-        page.wait_for_timeout(1500)
         return True
     except Exception as e:
         log_entries.append(f"Date filter error: {str(e)}")
@@ -83,6 +105,69 @@ def extract_table_data(page) -> dict:
     """)
 
 
+def run(browser, args: dict) -> dict:
+    """Apply the QMC filters and extract the table in a new context of `browser`."""
+    url = args.get("url")
+    # An in-memory storage_state dict (from login) wins over the state file
+    storage_state = args.get("storage_state") or args.get("browser_state_path")
+    timeout = args.get("timeout", 30000)
+    selectors = args.get("selectors", {})
+    
+    log_entries = []
+    today_str = datetime.now().strftime("%d_%m")
+    
+    context = browser.new_context(storage_state=storage_state)
+    context.route("**/*", block_assets)
+    page = context.new_page()
+    
+    try:
+        # Navigate to QMC
+        # The grid wait is the real readiness gate; networkidle would also wait on QMC's background XHRs
+        page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        page.wait_for_selector(selectors.get("grid", "table"), state="visible", timeout=timeout)
+        log_entries.append("Page loaded")
+        
+        # Apply filters
+        apply_tags_filter(page, "FE_HITOS_DIARIO", log_entries)
+        apply_date_filter(page, "Today", log_entries)
+        
+        # Wait for filtered results (an empty result simply times out)
+        wait_visible(page, "tbody tr")
+        page.screenshot(path=f"./debug/filter_result_{today_str}.jpg", type="jpeg", quality=60)
+        
+        # Extract data
+        table_data = extract_table_data(page)
+        log_entries.append(f"Extracted {table_data['totalRows']} rows")
+        
+        return {
+            "success": True,
+            "current_step": "extract",
+            "raw_table_data": orjson.dumps(table_data).decode(),
+            "error_message": None,
+            "logs": [f"[{datetime.now().isoformat()}] " + " | ".join(log_entries)]
+        }
+        
+    except Exception as e:
+        # Dump the DOM to a file; only its path travels back over the JSON channel
+        html_dump = f"./debug/error_{today_str}.html"
+        try:
+            page.screenshot(path=f"./debug/error_{today_str}.jpg", type="jpeg", quality=60)
+            with open(html_dump, "w", encoding="utf-8") as f:
+                f.write(page.content())
+        except Exception:
+            html_dump = None  # The page may be unusable; the error itself is still reported
+        return {
+            "success": False,
+            "current_step": "error",
+            "error_message": str(e),
+            "html_dump": html_dump,
+            "logs": [f"[{datetime.now().isoformat()}] Error: {e}"]
+        }
+        
+    finally:
+        context.close()
+
+
 def main():
     if len(sys.argv) < 2:
         print(json.dumps({"success": False, "error": "No arguments provided"}))
@@ -94,63 +179,15 @@ def main():
         print(json.dumps({"success": False, "error": f"Invalid JSON: {e}"}))
         sys.exit(1)
     
-    url = args.get("url")
-    browser_state_path = args.get("browser_state_path")
-    headless = args.get("headless", True)
-    timeout = args.get("timeout", 30000)
-    selectors = args.get("selectors", {})
-    
-    log_entries = []
-    today_str = datetime.now().strftime("%d_%m")
-    
     try:
         with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless)
-            context = browser.new_context(storage_state=browser_state_path)
-            page = context.new_page()
-            
+            browser = p.chromium.launch(headless=args.get("headless", True))
             try:
-                # Navigate to QMC
-                page.goto(url, timeout=timeout, wait_until="networkidle")
-                page.wait_for_selector(selectors.get("grid", "table"), timeout=timeout)
-                page.wait_for_timeout(2000)
-                log_entries.append("Page loaded")
-                
-                # Apply filters
-                apply_tags_filter(page, "FE_HITOS_DIARIO", log_entries)
-                apply_date_filter(page, "Today", log_entries)
-                
-                # Wait for filtered results
-                page.wait_for_timeout(2000)
-                page.screenshot(path=f"./debug/filter_result_{today_str}.png")
-                
-                # Extract data
-                table_data = extract_table_data(page)
-                log_entries.append(f"Extracted {table_data['totalRows']} rows")
-                
-                result = {
-                    "success": True,
-                    "current_step": "extract",
-                    "raw_table_data": json.dumps(table_data, indent=2, ensure_ascii=False),
-                    "page_html": page.content(),
-                    "error_message": None,
-                    "logs": [f"[{datetime.now().isoformat()}] " + " | ".join(log_entries)]
-                }
-                print(json.dumps(result))
-                
-            except Exception as e:
-                page.screenshot(path=f"./debug/error_{today_str}.png")
-                result = {
-                    "success": False,
-                    "current_step": "error",
-                    "error_message": str(e),
-                    "logs": [f"[{datetime.now().isoformat()}] Error: {e}"]
-                }
-                print(json.dumps(result))
-                
+                result = run(browser, args)
             finally:
                 browser.close()
-                
+        print(json.dumps(result))
+        
     except Exception as e:
         print(json.dumps({
             "success": False,
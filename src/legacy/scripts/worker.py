@@ -0,0 +1,21 @@
+"""
+Playwright Worker Script
+Long-lived process that keeps one Chromium open and serves filter/extract
+commands, one JSON object per line on stdin/stdout.
+Usage: python -u worker.py   (then write '{"cmd": "extract", "args": {...}}\n')
+"""
+
+from src.playwright_runner import serve
+
+import extract_script
+import filter_script
+
+# Each command opens and closes its own context, so the shared session is unused
+COMMANDS = {
+    "filter": lambda browser, args, session: filter_script.run(browser, args),
+    "extract": lambda browser, args, session: extract_script.run(browser, args),
+}
+
+
+if __name__ == "__main__":
+    serve(COMMANDS)
@@ -1,16 +1,16 @@
 """Test script for analyst module"""
 import sys
-import json
+import orjson
 sys.path.insert(0, '.')
 
 # Load actual data
-with open('qmc_tasks_20260127_123124.json', 'r') as f:
-    data = json.load(f)
+with open('qmc_tasks_20260127_123124.json', 'rb') as f:
+    data = orjson.loads(f.read())
 
 from src.analyst import analyst_node_sync
 
-# Simulate state like notebook does
-state = {'raw_table_data': json.dumps({'rows': data['tasks']})}
+# Simulate state like notebook does (the analyst also takes the decoded rows)
+state = {'raw_table_data': {'rows': data['tasks']}}
 
 result = analyst_node_sync(state)
 for log in result.get('logs', []):
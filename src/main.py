@@ -10,15 +10,18 @@ import os
 # Fix path to allow imports from project root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from src.config import Config
 from src.state import create_initial_state
-from src.nodes.login_node_sync import login_node_sync
-from src.nodes.extractor import extractor_node
-from src.nodes.analyst_llm import analyst_llm_node
+from src.nodes.qmc.login_node_sync import login_node_sync
+from src.nodes.qmc.extractor import extractor_node
+from src.nodes.qmc.analyst_llm import analyst_llm_node
 from src.nodes.reporter import reporter_node
+from src.nodes.llm import close_http_clients
 
 # Configuration for Logging
 LOG_DIR = "logs"
@@ -44,10 +47,13 @@ def setup_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
     
-    # Add Handlers
+    # Add Handlers: records go through a queue, file/console I/O runs on the listener thread
     if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
         
     return logger
 
@@ -58,40 +64,43 @@ async def run_agent(tags: List[str] = None):
     Main Async Entry Point for QMC Agent.
     """
     logger.info("🚀 Starting QMC Agent")
-    logger.info(f"📋 Target Tags: {tags if tags else 'ALL'}")
-    logger.debug(f"⚙️  Config: Headless={Config.HEADLESS}, Timeout={Config.TIMEOUT_MS}ms")
+    logger.info("📋 Target Tags: %s", tags if tags else 'ALL')
+    logger.debug("⚙️  Config: Headless=%s, Timeout=%sms", Config.HEADLESS, Config.TIMEOUT_MS)
     
     # 1. Initialize State
     state = create_initial_state()
     
-    # 2. Login (Sync Node via Subprocess)
+    # Sync nodes block on their Playwright worker; run them off the event loop
+    loop = asyncio.get_running_loop()
+    
+    # 2. Login (Sync Node via the shared Playwright worker; extract reuses its page)
     logger.info("🔑 Authenticating...")
     try:
-        login_result = login_node_sync(state)
+        login_result = await loop.run_in_executor(None, login_node_sync, state)
         state.update(login_result)
         
         if not login_result.get("success"):
-            logger.error(f"❌ Login Failed: {login_result.get('error_message')}")
+            logger.error("❌ Login Failed: %s", login_result.get('error_message'))
             return
         
         logger.info("✅ Login Success")
         
     except Exception as e:
-        logger.critical(f"❌ Login Critical Error: {str(e)}", exc_info=True)
+        logger.critical("❌ Login Critical Error: %s", e, exc_info=True)
         return
     
     # 3. Extraction (Global Filter)
     logger.info("🕷️ Extracting Data (Last execution = Today)...")
     try:
-        extract_result = extractor_node(state)
+        extract_result = await extractor_node(state)
         state.update(extract_result)
         
         if state.get("current_step") == "error":
-             logger.error(f"❌ Extraction Failed: {state.get('error_message')}")
+             logger.error("❌ Extraction Failed: %s", state.get('error_message'))
              return
              
     except Exception as e:
-        logger.error(f"❌ Extraction Exception: {str(e)}", exc_info=True)
+        logger.error("❌ Extraction Exception: %s", e, exc_info=True)
         return
 
     # 4. Partition & Analyze (LLM)
@@ -102,22 +111,22 @@ async def run_agent(tags: List[str] = None):
         state.update(analyst_result)
         
     except Exception as e:
-        logger.error(f"❌ Analysis Exception: {str(e)}", exc_info=True)
+        logger.error("❌ Analysis Exception: %s", e, exc_info=True)
         return
     
     # 5. Visual Report (Image)
     logger.info("🖼️ Generating Visual Report...")
     try:
-        report_result = reporter_node(state)
+        report_result = await loop.run_in_executor(None, reporter_node, state)
         state.update(report_result)
         
         if report_result.get("report_image_path"):
-            logger.info(f"✅ Report Image: {report_result.get('report_image_path')}")
+            logger.info("✅ Report Image: %s", report_result.get('report_image_path'))
         else:
             logger.warning("⚠️ Report generated but path missing?")
             
     except Exception as e:
-         logger.error(f"❌ Reporting Exception: {str(e)}", exc_info=True)
+         logger.error("❌ Reporting Exception: %s", e, exc_info=True)
 
     # 6. Final Console Summary
     reports = state.get("process_reports", {})
@@ -144,6 +153,14 @@ async def run_agent(tags: List[str] = None):
 
     logger.info("🏁 Agent Finished")
 
+
+async def main(tags: List[str] = None):
+    """Run the agent, then close the LLM connections opened on this event loop."""
+    try:
+        await run_agent(tags)
+    finally:
+        await close_http_clients()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="QMC Agent CLI")
     parser.add_argument("--tags", type=str, help="Comma-separated list of tags to monitor (e.g., FE_HITOS,FE_COBRANZAS)")
@@ -158,4 +175,4 @@ if __name__ == "__main__":
     elif args.all:
         target_tags = list(Config.MONITORED_PROCESSES.keys())
         
-    asyncio.run(run_agent(target_tags))
+    asyncio.run(main(target_tags))
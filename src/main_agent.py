@@ -4,64 +4,129 @@
 
 import sys
 import os
+import argparse
 import asyncio
+import atexit
 import logging
-import json
+import orjson
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 # Fix path to allow imports from project root
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+try:
+    import uvloop  # Optional, faster event loop (not available on Windows)
+except ImportError:
+    uvloop = None
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
 from src.graph import compile_unified_graph, compile_graph
 from src.state import create_initial_state
 from src.config import Config
+from src.nodes.llm import close_http_clients
 
 # Logger setup
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] [GRAPH] %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, "agent_graph.log"), encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+_log_formatter = logging.Formatter('%(asctime)s [%(levelname)s] [GRAPH] %(message)s')
+_log_handlers = [
+    logging.FileHandler(os.path.join(LOG_DIR, "agent_graph.log"), encoding='utf-8'),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+# Nodes log from the event loop: enqueue records, write them on the listener thread
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(_log_queue))
 logger = logging.getLogger("QMC_Agent")
 
+# Checkpoints of the unified graph, so a crashed run can resume (--resume THREAD_ID)
+CHECKPOINT_DB = os.path.join("state", "qmc_checkpoints.db")
+# Runs (threads) kept in CHECKPOINT_DB; older ones are pruned after each run
+CHECKPOINT_KEEP_THREADS = 20
+
+
+def open_checkpointer():
+    """Async context manager over the SQLite checkpointer; its connection closes on exit."""
+    os.makedirs(os.path.dirname(CHECKPOINT_DB), exist_ok=True)
+    return AsyncSqliteSaver.from_conn_string(CHECKPOINT_DB)
+
+
+async def prune_checkpoints(checkpointer: AsyncSqliteSaver, keep: int = CHECKPOINT_KEEP_THREADS) -> None:
+    """Delete every thread but the `keep` most recent ones from the checkpoint DB."""
+    threads = []
+    # Checkpoint ids are time-ordered, and alist() returns the newest first
+    async for checkpoint in checkpointer.alist(None):
+        thread_id = checkpoint.config["configurable"]["thread_id"]
+        if thread_id not in threads:
+            threads.append(thread_id)
+    for thread_id in threads[keep:]:
+        await checkpointer.adelete_thread(thread_id)
+
+
+def check_config(nprinting: bool = True) -> bool:
+    """Log missing settings; False when the QMC flow cannot run (NPrinting gaps only warn)."""
+    qmc_missing = Config.validate()
+    if qmc_missing:
+        logger.error(f"❌ Missing QMC configuration: {qmc_missing}")
+        logger.error("Please check your .env file and ensure all required variables are set.")
+        return False
+    
+    nprinting_missing = Config.validate_nprinting() if nprinting else []
+    if nprinting_missing:
+        logger.warning(f"⚠️ Missing NPrinting config: {nprinting_missing} - NPrinting flow will be skipped")
+    return True
+
 
-async def run_unified_graph():
+async def run_unified_graph(checkpointer: AsyncSqliteSaver, resume_thread: str = None):
     """
     Executes the Unified Multi-Agent Graph (QMC + NPrinting).
+    
+    With `resume_thread`, continues that run from its last checkpoint
+    instead of starting over (completed nodes are not executed again).
     """
     logger.info("🚀 Starting Unified Multi-Agent Workflow (QMC + NPrinting)")
     logger.info(f"📅 Execution Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Validate configuration
+    # Configuration is checked once up front (check_config); an error here is a plain exception
     qmc_missing = Config.validate()
-    nprinting_missing = Config.validate_nprinting()
-    
     if qmc_missing:
-        logger.error(f"❌ Missing QMC configuration: {qmc_missing}")
-        logger.error("Please check your .env file and ensure all required variables are set.")
-        sys.exit(1)
-    
-    if nprinting_missing:
-        logger.warning(f"⚠️ Missing NPrinting config: {nprinting_missing} - NPrinting flow will be skipped")
+        raise RuntimeError(f"Missing QMC configuration: {qmc_missing}")
     
     # 1. Compile the Unified Graph
     logger.info("⚙️ Compiling Unified Agent Graph...")
-    app = compile_unified_graph()
+    app = compile_unified_graph(checkpointer)
     
-    # 2. Initialize State
-    initial_state = create_initial_state()
+    # 2. Initialize State (a resumed run starts from its checkpoint instead)
+    thread_id = resume_thread or f"unified-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+    initial_state = None if resume_thread else create_initial_state()
+    
+    # Config for LangGraph (thread_id keys the checkpoints in CHECKPOINT_DB)
+    config = {"configurable": {"thread_id": thread_id}}
     
-    # Config for LangGraph (thread_id allows persistence/memory)
-    config = {"configurable": {"thread_id": f"unified-{datetime.now().strftime('%Y%m%d-%H%M%S')}"}}
+    # Nothing pending for an unknown or finished thread: ainvoke(None) would return None
+    if resume_thread and not (await app.aget_state(config)).next:
+        logger.error(f"❌ Thread {resume_thread} not found or already finished; nothing to resume")
+        return None
     
     # 3. Invoke Graph
-    logger.info("▶️ Invoking Unified Graph (QMC + NPrinting in parallel)...")
-    final_state = await app.ainvoke(initial_state, config)
+    logger.info(f"▶️ Invoking Unified Graph (QMC + NPrinting in parallel), thread {thread_id}...")
+    try:
+        final_state = await app.ainvoke(initial_state, config)
+    except Exception:
+        logger.error(f"❌ Run interrupted; resume with: python src/main_agent.py --resume {thread_id}")
+        raise
+    
+    await prune_checkpoints(checkpointer)
     
     # 4. Final Summary
     logger.info("=" * 60)
@@ -113,7 +178,8 @@ async def run_qmc_only():
     
     app = compile_graph()
     initial_state = create_initial_state()
-    config = {"configurable": {"thread_id": "qmc-only-1"}}
+    # A fresh MemorySaver and thread per run: service mode never continues the last run
+    config = {"configurable": {"thread_id": f"qmc-only-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"}}
     
     final_state = await app.ainvoke(initial_state, config)
     
@@ -121,15 +187,88 @@ async def run_qmc_only():
         logger.error(f"❌ Workflow failed: {final_state.get('error_message')}")
     else:
         logger.info("✅ QMC-Only Workflow completed")
-        print(json.dumps(final_state.get("process_reports", {}), indent=2, ensure_ascii=False))
+        # Serialize and write the report off the event loop (stdout may block)
+        report = orjson.dumps(final_state.get("process_reports", {}), option=orjson.OPT_INDENT_2)
+        await asyncio.to_thread(print, report.decode())
     
     return final_state
 
 
-if __name__ == "__main__":
-    # Check for command line args
-    if len(sys.argv) > 1 and sys.argv[1] == "--qmc-only":
-        asyncio.run(run_qmc_only())
-    else:
-        asyncio.run(run_unified_graph())
+async def run_service(every_minutes: float, run):
+    """
+    Service mode: await `run()` every `every_minutes` in one process.
+    
+    The Playwright workers (and their browsers) stay up between runs, so
+    only the first run pays for launching Chromium; each worker recycles
+    its browser after playwright_runner.WORKER_MAX_CALLS calls.
+    """
+    logger.info(f"🔁 Service mode: running every {every_minutes:g} min")
+    loop = asyncio.get_running_loop()
+    interval = every_minutes * 60
+    next_start = loop.time()
+    while True:
+        try:
+            await run()
+        except Exception as e:
+            logger.error(f"❌ Scheduled run failed: {str(e)}", exc_info=True)
+        
+        # Schedule from the start time so runs do not drift by their duration;
+        # a run longer than the interval skips the slots it overran
+        now = loop.time()
+        next_start += interval
+        if next_start < now:
+            next_start += ((now - next_start) // interval + 1) * interval
+        await asyncio.sleep(next_start - now)
+
+
+# Threads for sync graph nodes and to_thread calls: the flows block on at most
+# a few Playwright workers at once, so the default min(32, cpu+4) pool is oversized
+EXECUTOR_WORKERS = 4
 
+
+async def _with_bounded_executor(coro):
+    """Run `coro` with a small default thread pool on the running loop; close the loop's LLM connections after."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="qmc")
+    )
+    try:
+        return await coro
+    finally:
+        await close_http_clients()
+
+
+def positive_minutes(value: str) -> float:
+    """argparse type for --every: a zero or negative interval would never wait between runs."""
+    minutes = float(value)
+    if minutes <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return minutes
+
+
+async def main(args: argparse.Namespace):
+    """Dispatch the CLI mode; the unified flows hold the checkpoint DB open for their whole run."""
+    # Validated once, before any run or service loop starts
+    if not check_config(nprinting=not args.qmc_only):
+        sys.exit(1)
+    
+    if args.qmc_only:
+        if args.every is not None:
+            return await run_service(args.every, run_qmc_only)
+        return await run_qmc_only()
+    
+    async with open_checkpointer() as checkpointer:
+        if args.resume is not None:
+            return await run_unified_graph(checkpointer, args.resume)
+        if args.every is not None:
+            return await run_service(args.every, lambda: run_unified_graph(checkpointer))
+        return await run_unified_graph(checkpointer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="QMC Agent - Unified Multi-Agent Workflow")
+    parser.add_argument("--qmc-only", action="store_true", help="Run the legacy QMC-only workflow")
+    parser.add_argument("--every", type=positive_minutes, metavar="MINUTES", help="Service mode: run every MINUTES in one process")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Continue an interrupted unified run from its last checkpoint")
+    
+    run = uvloop.run if uvloop is not None else asyncio.run
+    run(_with_bounded_executor(main(parser.parse_args())))
@@ -1,32 +1,32 @@
 """
 QMC Agent - Nodes Package (V3)
 Contains all LangGraph nodes organized by source system.
-"""
-
-# QMC Nodes
-from src.nodes.qmc.login_node_sync import login_node_sync
-from src.nodes.qmc.extractor import extractor_node
-from src.nodes.qmc.analyst_llm import analyst_llm_node
 
-# NPrinting Nodes
-from src.nodes.nprinting.login_node import nprinting_login_node
-from src.nodes.nprinting.extractor import nprinting_extractor_node
-from src.nodes.nprinting.analyst import nprinting_analyst_node
+Nodes are resolved lazily on first access so importing one node does not
+load the Playwright/LLM dependencies of every other node.
+"""
 
-# Combined Nodes
-from src.nodes.combined_analyst import combined_analyst_node
-from src.nodes.reporter import reporter_node
+import importlib
 
-__all__ = [
+_NODE_MODULES = {
     # QMC
-    'login_node_sync',
-    'extractor_node', 
-    'analyst_llm_node',
+    'login_node_sync': 'src.nodes.qmc.login_node_sync',
+    'extractor_node': 'src.nodes.qmc.extractor',
+    'analyst_llm_node': 'src.nodes.qmc.analyst_llm',
     # NPrinting
-    'nprinting_login_node',
-    'nprinting_extractor_node',
-    'nprinting_analyst_node',
+    'nprinting_login_node': 'src.nodes.nprinting.login_node',
+    'nprinting_extractor_node': 'src.nodes.nprinting.extractor',
+    'nprinting_analyst_node': 'src.nodes.nprinting.analyst',
     # Combined
-    'combined_analyst_node',
-    'reporter_node',
-]
+    'combined_analyst_node': 'src.nodes.combined_analyst',
+    'reporter_node': 'src.nodes.reporter',
+}
+
+__all__ = list(_NODE_MODULES)
+
+
+def __getattr__(name):
+    module = _NODE_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
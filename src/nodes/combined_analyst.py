@@ -9,9 +9,12 @@ Optimizations:
 """
 
 import logging
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
 from typing import Dict
-import json
 
+from src.nodes.llm import get_llm, loop_cached
 from src.state import QMCState
 
 logger = logging.getLogger("Combined.Analyst")
@@ -22,50 +25,81 @@ def determine_overall_status(qmc_reports: Dict, nprinting_reports: Dict) -> str:
     Determine overall status based on both QMC and NPrinting reports.
     Hierarchy: Failed > Error > Running > Pending > Success
     """
-    all_statuses = []
-    
-    for report in list(qmc_reports.values()) + list(nprinting_reports.values()):
+    # One pass; the top of the hierarchy returns as soon as it is seen
+    seen = has_running = has_pending = not_success = False
+    for report in chain(qmc_reports.values(), nprinting_reports.values()):
         status = report.get("status", "").lower()
-        if status and status not in ["no data", "no run"]:
-            all_statuses.append(status)
+        if not status or status in ("no data", "no run"):
+            continue
+        if status in ("failed", "error"):
+            return "Failed"  # Map Error → Failed for reporting
+        seen = True
+        if status == "running":
+            has_running = True
+        elif status == "pending":
+            has_pending = True
+        elif status != "success":
+            not_success = True
     
-    if not all_statuses:
+    if not seen:
         return "No Data"
-    
-    # Apply hierarchy (including Error)
-    if any(s == "failed" for s in all_statuses):
-        return "Failed"
-    if any(s == "error" for s in all_statuses):
-        return "Failed"  # Map Error → Failed for reporting
-    if any(s == "running" for s in all_statuses):
+    if has_running:
         return "Running"
-    if any(s == "pending" for s in all_statuses):
-        return "Pending"
-    if all(s == "success" for s in all_statuses):
-        return "Success"
-    
-    return "Pending"  # Fallback to Pending instead of "Mixed"
+    if has_pending or not_success:
+        return "Pending"  # Fallback to Pending instead of "Mixed"
+    return "Success"
+
+
+_STATUS_KEYS = ("Success", "Running", "Failed", "Pending", "No Run", "Error")
 
 
 def count_by_status(reports: Dict) -> Dict[str, int]:
-    """Count processes by status."""
-    counts = {"Success": 0, "Running": 0, "Failed": 0, "Pending": 0, "No Run": 0, "Error": 0}
-    for report in reports.values():
-        status = report.get("status", "No Run")
-        if status in counts:
-            counts[status] += 1
-        else:
-            counts["No Run"] += 1
+    """Count processes by status (unknown statuses count as No Run)."""
+    tally = Counter(report.get("status", "No Run") for report in reports.values())
+    counts = {key: tally[key] for key in _STATUS_KEYS}
+    counts["No Run"] += len(reports) - sum(counts.values())
     return counts
 
 
+def _status_key(reports: Dict) -> tuple:
+    """Order-independent key of a report set: only the statuses matter for classification."""
+    return tuple(sorted((r.get("status") for r in reports.values()), key=str))
+
+
+@lru_cache(maxsize=256)
+def _classify(qmc_key: tuple, nprinting_key: tuple) -> tuple:
+    """(overall_status, qmc_counts, nprinting_counts) for the status keys; cached across polls."""
+    def as_reports(key):
+        return {i: {} if status is None else {"status": status} for i, status in enumerate(key)}
+    
+    qmc, nprinting = as_reports(qmc_key), as_reports(nprinting_key)
+    return determine_overall_status(qmc, nprinting), count_by_status(qmc), count_by_status(nprinting)
+
+
+@loop_cached
+def _summary_chain():
+    """Build the summary prompt | LLM chain once per event loop (LangChain is imported on first use)."""
+    from langchain_core.prompts import ChatPromptTemplate
+    
+    prompt = ChatPromptTemplate.from_template(
+        """Eres un redactor de reportes ejecutivos. Escribe un resumen ejecutivo de 1-2 oraciones EN ESPAÑOL
+para los siguientes resultados de monitoreo QMC + NPrinting. Sé directo y accionable.
+Si hay fallos, menciona los nombres de los procesos. Si todo está bien, dilo brevemente.
+
+{context}
+
+Responde SOLO con el texto del resumen, sin JSON, sin formato."""
+    )
+    return prompt | get_llm(0.3)
+
+
 async def generate_summary_llm(overall_status: str, qmc: Dict, nprinting: Dict) -> str:
     """Generate executive summary using LLM for natural language, with Python fallback."""
+    # Nothing to explain when everything succeeded: skip the LLM call
+    if overall_status == "Success":
+        return _generate_summary_fallback(overall_status, qmc, nprinting)
+    
     try:
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_groq import ChatGroq
-        from src.config import Config
-        
         # Build context
         qmc_items = []
         for p, r in qmc.items():
@@ -83,19 +117,7 @@ QMC Processes ({len(qmc)}):
 NPrinting Processes ({len(nprinting)}):
 {chr(10).join(nprinting_items) if nprinting_items else '  (none)'}"""
         
-        prompt = ChatPromptTemplate.from_template(
-            """Eres un redactor de reportes ejecutivos. Escribe un resumen ejecutivo de 1-2 oraciones EN ESPAÑOL
-para los siguientes resultados de monitoreo QMC + NPrinting. Sé directo y accionable.
-Si hay fallos, menciona los nombres de los procesos. Si todo está bien, dilo brevemente.
-
-{context}
-
-Responde SOLO con el texto del resumen, sin JSON, sin formato."""
-        )
-        
-        llm = ChatGroq(temperature=0.3, model_name=Config.GROQ_MODEL, api_key=Config.GROQ_API_KEY)
-        chain = prompt | llm
-        response = chain.invoke({"context": context})
+        response = await _summary_chain().ainvoke({"context": context})
         return response.content.strip()
         
     except Exception as e:
@@ -133,14 +155,15 @@ async def combined_analyst_node(state: QMCState) -> dict:
     qmc_reports = state.get("process_reports") or {}
     nprinting_reports = state.get("nprinting_reports") or {}
     
-    # Structured logging
-    logger.debug(f"QMC Reports received: {len(qmc_reports)}")
-    for process, report in qmc_reports.items():
-        logger.debug(f"  QMC | {process}: [{report.get('status', 'N/A')}]")
-    
-    logger.debug(f"NPrinting Reports received: {len(nprinting_reports)}")
-    for process, report in nprinting_reports.items():
-        logger.debug(f"  NPrinting | {process}: [{report.get('status', 'N/A')}] (tasks: {report.get('task_count', 'N/A')})")
+    # Structured logging (skipped entirely below DEBUG; formatting deferred to the handler)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("QMC Reports received: %d", len(qmc_reports))
+        for process, report in qmc_reports.items():
+            logger.debug("  QMC | %s: [%s]", process, report.get('status', 'N/A'))
+        
+        logger.debug("NPrinting Reports received: %d", len(nprinting_reports))
+        for process, report in nprinting_reports.items():
+            logger.debug("  NPrinting | %s: [%s] (tasks: %s)", process, report.get('status', 'N/A'), report.get('task_count', 'N/A'))
     
     # Handle empty cases — no data means tasks haven't run yet → Pending
     if not qmc_reports and not nprinting_reports:
@@ -153,24 +176,20 @@ async def combined_analyst_node(state: QMCState) -> dict:
             "logs": ["Combined: No data from either source — Pending"]
         }
     
-    # Count statuses
-    qmc_counts = count_by_status(qmc_reports)
-    nprinting_counts = count_by_status(nprinting_reports)
-    
-    # Determine overall status
-    overall_status = determine_overall_status(qmc_reports, nprinting_reports)
+    # Overall status and counts, memoized on the statuses (unchanged between polls)
+    overall_status, qmc_counts, nprinting_counts = _classify(_status_key(qmc_reports), _status_key(nprinting_reports))
     
     # Build combined report
     combined_report = {
         "overall_status": overall_status,
         "qmc": {
             "total_processes": len(qmc_reports),
-            "status_counts": qmc_counts,
+            "status_counts": dict(qmc_counts),
             "processes": qmc_reports
         },
         "nprinting": {
             "total_processes": len(nprinting_reports),
-            "status_counts": nprinting_counts,
+            "status_counts": dict(nprinting_counts),
             "processes": nprinting_reports
         },
         "summary": await generate_summary_llm(overall_status, qmc_reports, nprinting_reports)
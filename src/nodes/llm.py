@@ -0,0 +1,132 @@
+"""
+QMC Agent - Shared LLM Client
+One ChatGroq client per temperature (and event loop), created on first use and
+reused by every analyst node. They share the same HTTP connection pools, so
+keep-alive connections (and their TLS sessions) to the Groq API survive between
+calls. Async pools belong to the loop that opened them and are closed with
+close_http_clients() before that loop ends.
+"""
+
+import asyncio
+import atexit
+import copy
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import Optional
+
+from src.config import Config
+
+
+# Per-event-loop caches, keyed by id(loop); the loop is kept in the entry so an
+# id reused by a later loop is never mistaken for it
+_loop_caches: dict = {}
+_NO_LOOP_CACHE: dict = {}
+
+
+def _loop_cache() -> dict:
+    """Cache dict of the running event loop (a process-wide one outside any loop)."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _NO_LOOP_CACHE
+    entry = _loop_caches.get(id(loop))
+    if entry is None or entry[0] is not loop:
+        # Forget loops that were closed without close_http_clients()
+        for key, (old_loop, _) in list(_loop_caches.items()):
+            if old_loop.is_closed():
+                del _loop_caches[key]
+        entry = _loop_caches[id(loop)] = (loop, {})
+    return entry[1]
+
+
+def loop_cached(fn):
+    """
+    Cache `fn(*args)` per running event loop. For objects that hold the loop's
+    AsyncClient (LLMs, chains built on them): a later asyncio.run() must not
+    reuse connections opened by a loop that is already closed.
+    """
+    @wraps(fn)
+    def wrapper(*args):
+        cache = _loop_cache()
+        key = (fn, args)
+        if key not in cache:
+            cache[key] = fn(*args)
+        return cache[key]
+    return wrapper
+
+
+@lru_cache(maxsize=1)
+def _http_client():
+    """Sync httpx client shared by every ChatGroq instance (not tied to a loop)."""
+    import httpx
+    client = httpx.Client(limits=httpx.Limits(max_keepalive_connections=32))
+    atexit.register(client.close)
+    return client
+
+
+@loop_cached
+def _http_async_client():
+    """Async httpx client of the running loop; closed by close_http_clients()."""
+    import httpx
+    return httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=32))
+
+
+async def close_http_clients() -> None:
+    """Close the running loop's AsyncClient and drop the LLMs built on it (call before the loop ends)."""
+    loop = asyncio.get_running_loop()
+    entry = _loop_caches.pop(id(loop), None)
+    if entry is None:
+        return
+    client = entry[1].get((_http_async_client.__wrapped__, ()))
+    if client is not None:
+        await client.aclose()
+
+
+@loop_cached
+def get_llm(temperature: float = 0):
+    """Return the shared ChatGroq client for `temperature` (one per event loop)."""
+    from langchain_groq import ChatGroq
+    try:
+        asyncio.get_running_loop()
+        http_async_client = _http_async_client()
+    except RuntimeError:
+        http_async_client = None  # Sync use only: ChatGroq keeps its own default
+    return ChatGroq(
+        temperature=temperature,
+        model_name=Config.GROQ_MODEL,
+        api_key=Config.GROQ_API_KEY,
+        http_client=_http_client(),
+        http_async_client=http_async_client
+    )
+
+
+class ResponseCache:
+    """
+    LRU of parsed LLM results keyed by a digest of the prompt inputs.
+    Calls run at temperature 0, so unchanged inputs between polls reuse the answer.
+    """
+    
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+    
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Digest of the prompt inputs (process name, serialized tasks, ...)."""
+        return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return a deep copy of the cached result (callers annotate it), or None."""
+        result = self._data.get(key)
+        if result is None:
+            return None
+        self._data.move_to_end(key)
+        return copy.deepcopy(result)
+    
+    def put(self, key: str, result: dict) -> None:
+        """Store a deep copy, so later changes to `result` (lists included) never reach the cache."""
+        self._data[key] = copy.deepcopy(result)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
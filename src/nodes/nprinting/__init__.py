@@ -1,6 +1,17 @@
-# NPrinting Nodes Package
-from src.nodes.nprinting.login_node import nprinting_login_node
-from src.nodes.nprinting.extractor import nprinting_extractor_node
-from src.nodes.nprinting.analyst import nprinting_analyst_node
+# NPrinting Nodes Package (nodes are imported lazily on first access)
+import importlib
 
-__all__ = ['nprinting_login_node', 'nprinting_extractor_node', 'nprinting_analyst_node']
+_NODE_MODULES = {
+    'nprinting_login_node': 'src.nodes.nprinting.login_node',
+    'nprinting_extractor_node': 'src.nodes.nprinting.extractor',
+    'nprinting_analyst_node': 'src.nodes.nprinting.analyst',
+}
+
+__all__ = list(_NODE_MODULES)
+
+
+def __getattr__(name):
+    module = _NODE_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
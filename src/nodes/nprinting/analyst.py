@@ -5,22 +5,21 @@ Analyzes NPrinting tasks using LLM, filtering by prefix patterns.
 Optimizations:
 - Pydantic structured output (guaranteed format)
 - Retry with exponential backoff (tenacity)
-- Parallel LLM calls per process group (asyncio.gather)
+- Rule-based classification; remaining groups share ONE batched LLM call
 - Case-insensitive prefix matching
 - Logging instead of print
 """
 
-import asyncio
 import logging
-from typing import List, Dict, Literal
-import json
+from typing import List, Dict, Literal, Optional
+import orjson
 
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from src.config import Config
+from src.nodes.llm import ResponseCache, get_llm, loop_cached
 from src.state import QMCState
 
 logger = logging.getLogger("NPrinting.Analyst")
@@ -38,77 +37,151 @@ class NPrintingAnalysisResult(BaseModel):
     completed_tasks: int = 0
 
 
+class NPrintingBatchResult(BaseModel):
+    """Structured output for one batched call: analysis per process name."""
+    results: Dict[str, NPrintingAnalysisResult]
+
+
 # ============ Prefix Matching (Robust) ============
 
-def filter_tasks_by_prefix(tasks: List[Dict], prefix: str) -> List[Dict]:
-    """Filter tasks whose 'Task name' starts with the given prefix (case-insensitive, trimmed)."""
-    prefix_lower = prefix.strip().lower()
-    return [
-        t for t in tasks 
-        if t.get("Task name", "").strip().lower().startswith(prefix_lower)
-    ]
+def group_tasks_by_prefix(tasks: List[Dict], prefix_index: Dict[str, tuple]) -> Dict[str, List[Dict]]:
+    """
+    Bucket tasks by monitored prefix in a single pass (case-insensitive, trimmed).
+    `prefix_index` is Config.NPRINTING_PREFIX_INDEX; only prefixes sharing the
+    name's first character are tested.
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for t in tasks:
+        name = t.get("Task name", "").strip().lower()
+        for normalized, prefix in prefix_index.get(name[:1], ()):
+            if name.startswith(normalized):
+                groups.setdefault(prefix, []).append(t)
+    return groups
 
 
-# ============ LLM Call with Retry ============
+# ============ Rule-Based Classification ============
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type((Exception,)),
-    before_sleep=lambda rs: logger.warning(f"LLM call failed, retrying ({rs.attempt_number}/3)...")
-)
-def _invoke_llm(chain, params: dict) -> str:
-    """Invoke LLM with automatic retry on failure."""
-    response = chain.invoke(params)
-    return response.content
+# Status buckets of the prompt's hierarchy (lower-cased NPrinting statuses)
+_FAILED_STATUSES = frozenset({"failed", "error", "aborted"})
+_RUNNING_STATUSES = frozenset({"running"})
+_PENDING_STATUSES = frozenset({"queued", "waiting"})
+_KNOWN_STATUSES = _FAILED_STATUSES | _RUNNING_STATUSES | _PENDING_STATUSES | {"completed"}
 
 
-def _parse_llm_response(content: str) -> dict:
-    """Parse and validate LLM JSON response using Pydantic."""
-    # Log raw response for debugging
-    logger.debug(f"Raw LLM response: {content[:500]}")
-    
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0]
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0]
-    
+def _progress(value) -> Optional[int]:
+    """'60%' -> 60; None when missing or not a number."""
     try:
-        raw = json.loads(content.strip())
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parse failed. Content was: {content[:300]}")
-        raise ValueError(f"LLM returned invalid JSON: {e}")
-    
-    # Handle list responses — but only if the first item looks like an analysis
-    if isinstance(raw, list):
-        analysis_item = None
-        for item in raw:
-            if isinstance(item, dict) and "status" in item and "summary" in item:
-                analysis_item = item
-                break
-        if analysis_item:
-            raw = analysis_item
+        return int(str(value).strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+def fast_classify(tasks: List[Dict], allow_unknown: bool = False) -> Optional[Dict]:
+    """
+    Apply the prompt's status hierarchy in one pass when every status is known.
+    Returns an NPrintingAnalysisResult-shaped dict, or None to defer to the LLM;
+    with `allow_unknown`, unknown statuses count as pending instead.
+    """
+    failed, running = [], []
+    completed = pending = 0
+    for t in tasks:
+        name = t.get("Task name")
+        status = (t.get("Status") or "").strip().lower()
+        if status not in _KNOWN_STATUSES and not allow_unknown:
+            return None
+        if status in _FAILED_STATUSES:
+            failed.append(name)
+        elif status == "completed":
+            progress = _progress(t.get("Progress"))
+            if progress == 100:
+                completed += 1
+            elif progress is None and not allow_unknown:
+                return None
+            else:
+                running.append(name)  # Completed below 100% is still generating
+        elif status in _RUNNING_STATUSES:
+            running.append(name)
         else:
-            logger.error(f"LLM returned list without analysis. First item keys: {list(raw[0].keys()) if raw and isinstance(raw[0], dict) else 'N/A'}")
-            raise ValueError(f"LLM returned a list of raw tasks instead of analysis. Got {len(raw)} items.")
+            pending += 1
     
-    # Validate the parsed dict has expected fields
-    if not isinstance(raw, dict) or "status" not in raw:
-        logger.error(f"Unexpected format. Keys: {list(raw.keys()) if isinstance(raw, dict) else type(raw)}")
-        raise ValueError(f"LLM returned unexpected format. Keys found: {list(raw.keys()) if isinstance(raw, dict) else type(raw)}")
+    total = len(tasks)
+    if not total:
+        return None
+    if failed:
+        status, summary = "Failed", f"{len(failed)} of {total} reports failed: {', '.join(failed)}."
+    elif running:
+        status, summary = "Running", f"{len(running)} report(s) still generating: {', '.join(running)}."
+    elif pending:
+        status, summary = "Pending", f"{pending} of {total} reports queued."
+    else:
+        status, summary = "Success", f"All {total} reports generated successfully."
     
-    result = NPrintingAnalysisResult(**raw)
-    return result.model_dump()
+    return {
+        "status": status,
+        "summary": summary,
+        "failed_tasks": failed,
+        "running_tasks": running,
+        "total_tasks": total,
+        "completed_tasks": completed
+    }
 
 
 # ============ Core Analysis ============
 
-def analyze_nprinting_group(process_name: str, tasks: List[Dict], llm) -> Dict:
-    """Analyzes a single group of NPrinting tasks using LLM."""
-    if not tasks:
-        return {"status": "No Data", "summary": "No tasks found for this process today."}
+# Static instructions first (identical on every call, so provider prefix caches hit);
+# the groups to analyze come last, in the human message
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    Act as an NPrinting Report Analyst. Analyze each group of tasks below; groups are keyed by process name.
+    
+    Context:
+    - These are NPrinting report generation tasks.
+    - Status can be: Completed, Running, Failed, Queued, Aborted, etc.
+    - Progress is a percentage (0-100%).
     
-    simplified_tasks = [
+    STRICT Status Hierarchy, applied to each group separately (Top priority wins):
+    1. "Failed": If ANY task has 'Failed', 'Error', 'Aborted' status.
+    2. "Running": If NO failures, but ANY task is 'Running' or progress < 100%.
+    3. "Pending": If NO failures and NO running, but tasks are 'Queued' or 'Waiting'.
+    4. "Success": If and ONLY IF ALL tasks are 'Completed' with 100% progress.
+    
+    === FEW-SHOT EXAMPLES (one group each) ===
+    
+    Example 1 (All Completed):
+    Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Completed", "Progress": "100%"}}]
+    Output: {{"status": "Success", "summary": "All 2 reports generated successfully.", "failed_tasks": [], "running_tasks": [], "total_tasks": 2, "completed_tasks": 2}}
+    
+    Example 2 (One Failed):
+    Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Failed", "Progress": "0%"}}]
+    Output: {{"status": "Failed", "summary": "1 of 2 reports failed: h. Tablero Eficiencia Comercial - Gerencial.", "failed_tasks": ["h. Tablero Eficiencia Comercial - Gerencial"], "running_tasks": [], "total_tasks": 2, "completed_tasks": 1}}
+    
+    Example 3 (Still Running):
+    Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Running", "Progress": "60%"}}]
+    Output: {{"status": "Running", "summary": "1 report still generating: h. Tablero Eficiencia Comercial - Gerencial (60%).", "failed_tasks": [], "running_tasks": ["h. Tablero Eficiencia Comercial - Gerencial"], "total_tasks": 2, "completed_tasks": 1}}
+    
+    === END EXAMPLES ===
+    
+    Output format (one entry per group, same keys as the input):
+    {{
+        "results": {{
+            "<process name>": {{
+                "status": "Success" | "Running" | "Failed" | "Pending",
+                "summary": "Brief explanation (max 1 sentence)",
+                "failed_tasks": ["List of failed task names"],
+                "running_tasks": ["List of running task names"],
+                "total_tasks": <number>,
+                "completed_tasks": <number>
+            }}
+        }}
+    }}
+    """),
+    ("human", "Groups to analyze:\n{groups_json}"),
+])
+
+
+def simplify_tasks(tasks: List[Dict]) -> List[Dict]:
+    """Reduce tasks to the fields the prompt needs."""
+    return [
         {
             "Task name": t.get("Task name"),
             "Status": t.get("Status"),
@@ -117,133 +190,106 @@ def analyze_nprinting_group(process_name: str, tasks: List[Dict], llm) -> Dict:
         }
         for t in tasks
     ]
-    
-    prompt = ChatPromptTemplate.from_template(
-        """
-        Act as an NPrinting Report Analyst. Analyze the following tasks for '{process_name}'.
-        
-        Context:
-        - These are NPrinting report generation tasks.
-        - Status can be: Completed, Running, Failed, Queued, Aborted, etc.
-        - Progress is a percentage (0-100%).
-        
-        STRICT Status Hierarchy (Top priority wins):
-        1. "Failed": If ANY task has 'Failed', 'Error', 'Aborted' status.
-        2. "Running": If NO failures, but ANY task is 'Running' or progress < 100%.
-        3. "Pending": If NO failures and NO running, but tasks are 'Queued' or 'Waiting'.
-        4. "Success": If and ONLY IF ALL tasks are 'Completed' with 100% progress.
-        
-        === FEW-SHOT EXAMPLES ===
-        
-        Example 1 (All Completed):
-        Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Completed", "Progress": "100%"}}]
-        Output: {{"status": "Success", "summary": "All 2 reports generated successfully.", "failed_tasks": [], "running_tasks": [], "total_tasks": 2, "completed_tasks": 2}}
-        
-        Example 2 (One Failed):
-        Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Failed", "Progress": "0%"}}]
-        Output: {{"status": "Failed", "summary": "1 of 2 reports failed: h. Tablero Eficiencia Comercial - Gerencial.", "failed_tasks": ["h. Tablero Eficiencia Comercial - Gerencial"], "running_tasks": [], "total_tasks": 2, "completed_tasks": 1}}
-        
-        Example 3 (Still Running):
-        Input: [{{"Task name": "h. Tablero Eficiencia Comercial - Tiendas", "Status": "Completed", "Progress": "100%"}}, {{"Task name": "h. Tablero Eficiencia Comercial - Gerencial", "Status": "Running", "Progress": "60%"}}]
-        Output: {{"status": "Running", "summary": "1 report still generating: h. Tablero Eficiencia Comercial - Gerencial (60%).", "failed_tasks": [], "running_tasks": ["h. Tablero Eficiencia Comercial - Gerencial"], "total_tasks": 2, "completed_tasks": 1}}
-        
-        === END EXAMPLES ===
-        
-        Tasks to analyze:
-        {tasks_json}
-        
-        Output format (JSON only):
-        {{
-            "status": "Success" | "Running" | "Failed" | "Pending",
-            "summary": "Brief explanation (max 1 sentence)",
-            "failed_tasks": ["List of failed task names"],
-            "running_tasks": ["List of running task names"],
-            "total_tasks": <number>,
-            "completed_tasks": <number>
-        }}
-        """
-    )
-    
-    chain = prompt | llm
+
+
+@loop_cached
+def _analysis_chain():
+    """
+    Build the prompt | LLM chain once. The LLM answers through a tool call bound
+    to NPrintingBatchResult, so the reply is validated by the schema, not by parsing text.
+    """
+    return ANALYSIS_PROMPT | get_llm(0).with_structured_output(NPrintingBatchResult)
+
+
+async def analyze_nprinting_groups(groups: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """Analyzes several groups of simplified NPrinting tasks in a single LLM call."""
+    aliases = list(groups)
+    chain = _analysis_chain()
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         retry=retry_if_exception_type((Exception,)),
-        before_sleep=lambda rs: logger.warning(f"Analysis failed for {process_name}, retrying ({rs.attempt_number}/3)...")
+        before_sleep=lambda rs: logger.warning(f"Batched analysis failed, retrying ({rs.attempt_number}/3)...")
     )
-    def _analyze_with_retry():
-        content = chain.invoke({
-            "process_name": process_name,
-            "tasks_json": json.dumps(simplified_tasks, indent=2)
-        }).content
-        return _parse_llm_response(content)
+    async def _analyze_with_retry():
+        batch: NPrintingBatchResult = await chain.ainvoke({"groups_json": orjson.dumps(groups).decode()})
+        missing = [alias for alias in aliases if alias not in batch.results]
+        if missing:
+            raise ValueError(f"LLM response is missing groups: {missing}")
+        return {alias: batch.results[alias].model_dump() for alias in aliases}
     
     try:
-        return _analyze_with_retry()
+        return await _analyze_with_retry()
     except Exception as e:
-        logger.error(f"LLM Analysis failed for {process_name} after retries: {e}")
-        return {"status": "Error", "summary": f"LLM Analysis failed: {str(e)}"}
+        logger.error(f"LLM Analysis failed for {aliases} after retries: {e}")
+        return {alias: {"status": "Error", "summary": f"LLM Analysis failed: {str(e)}"} for alias in aliases}
+
 
+# Parsed LLM results by (alias, tasks); skips the call for unchanged groups
+_RESULT_CACHE = ResponseCache()
 
-# ============ Main Node (Parallel) ============
+
+# ============ Main Node ============
 
 async def nprinting_analyst_node(state: QMCState) -> dict:
     """
     NPrinting Analyst Node:
     - Partitions data by prefix patterns.
-    - Calls LLM in PARALLEL for each monitored process.
+    - Classifies unambiguous groups in Python; the rest share ONE LLM call.
     - Aggregates results.
     """
     logger.info("Starting NPrinting LLM Analysis...")
     
-    llm = ChatGroq(
-        temperature=0,
-        model_name=Config.GROQ_MODEL,
-        api_key=Config.GROQ_API_KEY
-    )
-    
     all_tasks = state.get("nprinting_data") or []
     if not all_tasks:
         return {"nprinting_reports": {}, "logs": ["NPrinting: No data to analyze"]}
     
     monitored_prefixes = Config.NPRINTING_MONITORED
+    grouped = group_tasks_by_prefix(all_tasks, Config.NPRINTING_PREFIX_INDEX)
     
-    # Parallel LLM calls (staggered to avoid rate limits)
-    async def _analyze_one(prefix, alias, delay):
-        await asyncio.sleep(delay)  # Stagger calls to avoid 429s
-        prefix_tasks = filter_tasks_by_prefix(all_tasks, prefix)
+    final_report = {}
+    undecided = {}
+    cache_keys = {}
+    for prefix, alias in monitored_prefixes.items():
+        prefix_tasks = grouped.get(prefix, [])
         logger.info(f"  Analyzing {alias} ({len(prefix_tasks)} tasks, prefix='{prefix}')...")
         
         if not prefix_tasks:
-            return alias, {
-                "status": "Pending",
-                "summary": "Tasks have not been executed yet.",
-                "prefix": prefix,
-                "task_count": 0
-            }
+            final_report[alias] = {"status": "Pending", "summary": "Tasks have not been executed yet."}
+            continue
         
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, analyze_nprinting_group, alias, prefix_tasks, llm)
-        result["prefix"] = prefix
-        result["task_count"] = len(prefix_tasks)
-        logger.info(f"  {alias}: {result.get('status')} - {result.get('summary')}")
-        return alias, result
+        simplified_tasks = simplify_tasks(prefix_tasks)
+        decided = fast_classify(simplified_tasks, allow_unknown=not Config.LLM_FALLBACK)
+        if decided is not None:
+            final_report[alias] = decided
+            continue
+        
+        cache_keys[alias] = ResponseCache.key(alias, orjson.dumps(simplified_tasks).decode())
+        cached = _RESULT_CACHE.get(cache_keys[alias])
+        if cached is not None:
+            final_report[alias] = cached
+        else:
+            undecided[alias] = simplified_tasks
     
-    # Launch analyses with 0.5s stagger between each
-    tasks = [_analyze_one(prefix, alias, i * 0.5) for i, (prefix, alias) in enumerate(monitored_prefixes.items())]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # All remaining groups in one prompt: one round-trip, one prefill of the instructions
+    if undecided:
+        results = await analyze_nprinting_groups(undecided)
+        for alias, result in results.items():
+            if result.get("status") != "Error":
+                _RESULT_CACHE.put(cache_keys[alias], result)
+        final_report.update(results)
     
-    # Collect results
-    final_report = {}
-    for r in results:
-        if isinstance(r, Exception):
-            logger.error(f"Parallel analysis failed: {r}")
-            continue
-        alias, analysis = r
-        final_report[alias] = analysis
+    # Keep the monitored order and annotate each group
+    reports = {}
+    for prefix, alias in monitored_prefixes.items():
+        result = final_report[alias]
+        result["prefix"] = prefix
+        result["task_count"] = len(grouped.get(prefix, []))
+        logger.info(f"  {alias}: {result.get('status')} - {result.get('summary')}")
+        reports[alias] = result
     
     return {
-        "nprinting_reports": final_report,
-        "logs": [f"NPrinting: Analyzed {len(final_report)} process groups (parallel)"]
+        "nprinting_reports": reports,
+        "logs": [f"NPrinting: Analyzed {len(reports)} process groups ({len(undecided)} via LLM)"]
     }
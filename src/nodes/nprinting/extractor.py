@@ -3,18 +3,25 @@ NPrinting Extractor Node
 LangGraph node wrapper for NPrinting data extraction.
 """
 
-import json
-from src.playwright_runner import run_playwright_script
+import orjson
+from pathlib import Path
+from src.playwright_runner import get_worker
 from src.config import Config
+from src.nodes.nprinting.login_node import forget_saved_session, nprinting_login_node
 from src.state import QMCState
 
 
+# One long-lived Playwright process serves login and extract (same browser/page)
+_WORKER_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "nprinting" / "worker.py"
+
+
 def nprinting_extractor_node(state: QMCState) -> dict:
     """
     NPrinting Extractor Node:
     - Applies 'Today' filter.
     - Clicks '100' pagination to show all records.
     - Extracts Task name, Status, Progress, Created.
+    - Logs in again if the reused saved session turns out to be dead.
     """
     print("   [NPrinting Extractor] Starting extraction...")
     
@@ -26,17 +33,30 @@ def nprinting_extractor_node(state: QMCState) -> dict:
         "nprinting_state_path": state.get("nprinting_state_path", "nprinting_browser_state.json")
     }
     
-    result = run_playwright_script("nprinting/extract_script.py", args)
+    result = get_worker(_WORKER_SCRIPT).call("extract", args)
+    
+    # Saved cookies can outlive the server-side session (idle timeout, restart,
+    # logout): drop the state file and retry once after a real login
+    relogin = {}
+    if not result.get("success") and state.get("nprinting_session_reused"):
+        print("   [NPrinting Extractor] Saved session rejected, logging in again...")
+        forget_saved_session()
+        relogin = nprinting_login_node(state)
+        if relogin.get("nprinting_cookies") is not None:
+            args["nprinting_state_path"] = relogin["nprinting_state_path"]
+            result = get_worker(_WORKER_SCRIPT).call("extract", args)
+    relogin_logs = relogin.pop("logs", [])
     
     if not result.get("success"):
         print(f"   [NPrinting Extractor] Failed: {result.get('error')}")
         return {
-            "nprinting_error": f"NPrinting extraction failed: {result.get('error')}",
+            **relogin,
+            "nprinting_error": relogin.get("nprinting_error") or f"NPrinting extraction failed: {result.get('error')}",
             "nprinting_data": [],
-            "logs": [f"NPrinting Extraction Error: {result.get('error')}"]
+            "logs": relogin_logs + [f"NPrinting Extraction Error: {result.get('error')}"]
         }
     
-    raw_data = result.get("raw_data", "[]")
+    rows = result.get("rows", [])
     total = result.get("total", 0)
     filter_applied = result.get("filter_applied", False)
     pagination_clicked = result.get("pagination_clicked", False)
@@ -44,10 +64,11 @@ def nprinting_extractor_node(state: QMCState) -> dict:
     log = f"NPrinting: Extracted {total} tasks (Filter: {filter_applied}, Pagination: {pagination_clicked})"
     print(f"   [NPrinting Extractor] {log}")
     
+    # Rows arrive already decoded from the worker's JSON line
     return {
-        "nprinting_raw_data": raw_data,
-        "nprinting_data": json.loads(raw_data),
-        "logs": [log]
+        **relogin,
+        "nprinting_data": rows,
+        "logs": relogin_logs + [log]
     }
 
 
@@ -57,4 +78,4 @@ if __name__ == "__main__":
     
     state = create_initial_state()
     result = nprinting_extractor_node(state)
-    print("Result:", json.dumps(result, indent=2))
+    print("Result:", orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
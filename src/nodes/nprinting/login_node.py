@@ -3,18 +3,63 @@ NPrinting Login Node
 LangGraph node wrapper for NPrinting authentication.
 """
 
-from src.playwright_runner import run_playwright_script
+import time
+from pathlib import Path
+from typing import Optional
+import orjson
+from src.playwright_runner import get_worker
 from src.config import Config
 from src.state import QMCState
 
 
+# One long-lived Playwright process serves login and extract (same browser/page)
+_WORKER_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "nprinting" / "worker.py"
+
+# Saved by the login script, relative to the worker's cwd (the project root)
+_STATE_PATH = "nprinting_browser_state.json"
+_STATE_FILE = Path(__file__).resolve().parents[3] / _STATE_PATH
+
+
+def _cached_session(state_file: Path) -> Optional[dict]:
+    """
+    Return the cookies of the saved NPrinting session if one of its auth
+    cookies stays valid for Config.COOKIE_MIN_TTL seconds, else None.
+    """
+    try:
+        cookies = orjson.loads(state_file.read_bytes()).get("cookies", [])
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    
+    # Session cookies (expires = -1) cannot be judged, so they never short-circuit login
+    valid_until = time.time() + Config.COOKIE_MIN_TTL
+    if any(c.get("name") in Config.NPRINTING_AUTH_COOKIES and c.get("expires", -1) > valid_until for c in cookies):
+        return {c["name"]: c["value"] for c in cookies}
+    return None
+
+
+def forget_saved_session() -> None:
+    """Delete the saved session, so the next login goes through the browser."""
+    _STATE_FILE.unlink(missing_ok=True)
+
+
 def nprinting_login_node(state: QMCState) -> dict:
     """
     NPrinting Login Node:
     - Authenticates to NPrinting using email/password.
     - Saves session cookies and browser state.
-    - Runs in subprocess to avoid asyncio conflicts.
+    - Skips the browser when the saved session is still valid.
+    - Runs in the shared NPrinting worker process (avoids asyncio conflicts).
     """
+    cookies = _cached_session(_STATE_FILE)
+    if cookies is not None:
+        print("   [NPrinting Login] Reusing saved session")
+        return {
+            "nprinting_cookies": cookies,
+            "nprinting_state_path": _STATE_PATH,
+            "nprinting_session_reused": True,
+            "logs": ["NPrinting login: reused cached session"]
+        }
+    
     print("   [NPrinting Login] Starting authentication...")
     
     args = {
@@ -28,13 +73,14 @@ def nprinting_login_node(state: QMCState) -> dict:
         "max_retries": state.get("max_retries", 3)
     }
     
-    result = run_playwright_script("nprinting/login_script.py", args)
+    result = get_worker(_WORKER_SCRIPT).call("login", args)
     
     if result.get("success"):
         print("   [NPrinting Login] Authentication successful!")
         return {
             "nprinting_cookies": result.get("nprinting_cookies"),
             "nprinting_state_path": result.get("nprinting_state_path"),
+            "nprinting_session_reused": False,
             "logs": result.get("logs", [])
         }
     else:
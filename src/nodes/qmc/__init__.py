@@ -1,6 +1,17 @@
-# QMC Nodes Package
-from src.nodes.qmc.login_node_sync import login_node_sync
-from src.nodes.qmc.extractor import extractor_node
-from src.nodes.qmc.analyst_llm import analyst_llm_node
+# QMC Nodes Package (nodes are imported lazily on first access)
+import importlib
 
-__all__ = ['login_node_sync', 'extractor_node', 'analyst_llm_node']
+_NODE_MODULES = {
+    'login_node_sync': 'src.nodes.qmc.login_node_sync',
+    'extractor_node': 'src.nodes.qmc.extractor',
+    'analyst_llm_node': 'src.nodes.qmc.analyst_llm',
+}
+
+__all__ = list(_NODE_MODULES)
+
+
+def __getattr__(name):
+    module = _NODE_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
@@ -4,22 +4,20 @@ Uses Groq (LLaMA 3) to analyze QMC process groups dynamically.
 
 Optimizations:
 - Pydantic structured output (guaranteed format)
-- Retry with exponential backoff (tenacity)
-- Parallel LLM calls per process group (asyncio.gather)
+- Retry with exponential backoff (Runnable.with_retry)
+- One batched LLM call over all process groups (chain.abatch, capped concurrency)
 - Logging instead of print
 """
 
-import asyncio
 import logging
-from typing import List, Dict, Literal
-import json
+from typing import List, Dict, Literal, Optional, Tuple
 
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from langchain_core.runnables import RunnableLambda
 
 from src.config import Config
+from src.nodes.llm import ResponseCache, get_llm, loop_cached
 from src.state import QMCState
 
 logger = logging.getLogger("QMC.Analyst")
@@ -35,133 +33,119 @@ class AnalysisResult(BaseModel):
     running_tasks: List[str] = Field(default_factory=list)
 
 
-# ============ LLM Call with Retry ============
-
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type((Exception,)),
-    before_sleep=lambda rs: logger.warning(f"LLM call failed, retrying ({rs.attempt_number}/3)...")
-)
-def _invoke_llm(chain, params: dict) -> str:
-    """Invoke LLM with automatic retry on failure."""
-    response = chain.invoke(params)
-    return response.content
-
-
-def _parse_llm_response(content: str) -> dict:
-    """Parse and validate LLM JSON response using Pydantic."""
-    # Strip markdown fences
-    if "```json" in content:
-        content = content.split("```json")[1].split("```")[0]
-    elif "```" in content:
-        content = content.split("```")[1].split("```")[0]
-    
-    raw = json.loads(content.strip())
-    
-    # Handle list responses — only accept items that look like analysis
-    if isinstance(raw, list):
-        analysis_item = None
-        for item in raw:
-            if isinstance(item, dict) and "status" in item and "summary" in item:
-                analysis_item = item
-                break
-        if analysis_item:
-            raw = analysis_item
-        else:
-            raise ValueError(f"LLM returned a list of raw tasks instead of analysis. Got {len(raw)} items.")
+# ============ Core Analysis ============
+
+# Static instructions first (identical on every call, so provider prefix caches hit);
+# the per-group data comes last, in the human message
+ANALYSIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    Act as a Qlik Process Analyst. Analyze the list of tasks for the process given in the user message.
+    
+    Context:
+    - These tasks ran TODAY.
+    - ALL provided tasks are ENABLED (Critical for the process).
+    STRICT Status Hierarchy (Top priority wins):
+    1. "Failed": If ANY task is 'Failed', 'Error', 'Aborted', 'Skipped', 'Never started', or 'Reset'.
+    2. "Running": If NO failures, but ANY task is 'Started', 'Triggered', 'Retrying', 'Aborting'.
+    3. "Pending": If NO failures and NO active execution, but tasks are 'Queued'.
+    4. "Success": If and ONLY IF ALL tasks are 'Success'.
+    
+    Tasks are given one per line as: Name|Status|Last execution
     
-    # Validate expected fields exist
-    if not isinstance(raw, dict) or "status" not in raw:
-        raise ValueError(f"LLM returned unexpected format. Keys: {list(raw.keys()) if isinstance(raw, dict) else type(raw)}")
+    === FEW-SHOT EXAMPLES ===
     
-    # Validate with Pydantic
-    result = AnalysisResult(**raw)
-    return result.model_dump()
+    Example 1 (All Success):
+    Input:
+    FE_HITOS_DIARIO|Success|2026-01-27 06:15:30
+    FE_COBRANZAS_DIARIA|Success|2026-01-27 06:40:12
+    Output: {{"status": "Success", "summary": "All 2 tasks completed successfully.", "failed_tasks": [], "running_tasks": []}}
+    
+    Example 2 (One Failed):
+    Input:
+    FE_HITOS_DIARIO|Success|2026-01-27 06:15:30
+    FE_COBRANZAS_DIARIA|Failed|2026-01-27 06:40:12
+    Output: {{"status": "Failed", "summary": "1 of 2 tasks failed: FE_COBRANZAS_DIARIA.", "failed_tasks": ["FE_COBRANZAS_DIARIA"], "running_tasks": []}}
+    
+    Example 3 (Mixed with Running):
+    Input:
+    FE_HITOS_DIARIO|Success|2026-01-27 06:15:30
+    FE_COBRANZAS_DIARIA|Started|2026-01-27 06:40:12
+    Output: {{"status": "Running", "summary": "1 task still running: FE_COBRANZAS_DIARIA.", "failed_tasks": [], "running_tasks": ["FE_COBRANZAS_DIARIA"]}}
+    
+    === END EXAMPLES ===
+    
+    Output format:
+    {{
+        "status": "Success" | "Running" | "Failed" | "Pending",
+        "summary": "Brief explanation (max 1 sentence)",
+        "failed_tasks": ["List of task names that failed or were skipped"],
+        "running_tasks": ["List of task names still running"]
+    }}
+    """),
+    ("human", "Process: {process_name}\nTasks to analyze:\n{tasks_table}"),
+])
 
 
-# ============ Core Analysis ============
+def simplify_task(task: Dict) -> Tuple[str, str, str]:
+    """Reduce a task to the (Name, Status, Last execution) the prompt needs."""
+    return (task.get("Name") or "", task.get("Status") or "", task.get("Last execution") or "")
 
-def analyze_group(process_name: str, tasks: List[Dict], llm) -> Dict:
-    """Analyzes a single group of tasks using LLM."""
-    if not tasks:
-        return {"status": "No Data", "summary": "No tasks found for this process today."}
-
-    # Filter out disabled tasks
-    simplified_tasks = [
-        {
-            "Name": t.get("Name"),
-            "Status": t.get("Status"),
-            "Last execution": t.get("Last execution")
-        }
-        for t in tasks if t.get("Enabled") == "Yes"
-    ]
-    
-    if not simplified_tasks:
-        return {"status": "No Run", "summary": "No ENABLED tasks found for this process today."}
-        
-    prompt = ChatPromptTemplate.from_template(
-        """
-        Act as a Qlik Process Analyst. Analyze the following list of tasks for the process '{process_name}'.
-        
-        Context:
-        - These tasks ran TODAY.
-        - ALL provided tasks are ENABLED (Critical for the process).
-        STRICT Status Hierarchy (Top priority wins):
-        1. "Failed": If ANY task is 'Failed', 'Error', 'Aborted', 'Skipped', 'Never started', or 'Reset'.
-        2. "Running": If NO failures, but ANY task is 'Started', 'Triggered', 'Retrying', 'Aborting'.
-        3. "Pending": If NO failures and NO active execution, but tasks are 'Queued'.
-        4. "Success": If and ONLY IF ALL tasks are 'Success'.
-        
-        === FEW-SHOT EXAMPLES ===
-        
-        Example 1 (All Success):
-        Input: [{{"Name": "FE_HITOS_DIARIO", "Status": "Success"}}, {{"Name": "FE_COBRANZAS_DIARIA", "Status": "Success"}}]
-        Output: {{"status": "Success", "summary": "All 2 tasks completed successfully.", "failed_tasks": [], "running_tasks": []}}
-        
-        Example 2 (One Failed):
-        Input: [{{"Name": "FE_HITOS_DIARIO", "Status": "Success"}}, {{"Name": "FE_COBRANZAS_DIARIA", "Status": "Failed"}}]
-        Output: {{"status": "Failed", "summary": "1 of 2 tasks failed: FE_COBRANZAS_DIARIA.", "failed_tasks": ["FE_COBRANZAS_DIARIA"], "running_tasks": []}}
-        
-        Example 3 (Mixed with Running):
-        Input: [{{"Name": "FE_HITOS_DIARIO", "Status": "Success"}}, {{"Name": "FE_COBRANZAS_DIARIA", "Status": "Started"}}]
-        Output: {{"status": "Running", "summary": "1 task still running: FE_COBRANZAS_DIARIA.", "failed_tasks": [], "running_tasks": ["FE_COBRANZAS_DIARIA"]}}
-        
-        === END EXAMPLES ===
-        
-        Tasks to analyze:
-        {tasks_json}
-        
-        Output format (JSON only):
-        {{
-            "status": "Success" | "Running" | "Failed" | "Pending",
-            "summary": "Brief explanation (max 1 sentence)",
-            "failed_tasks": ["List of task names that failed or were skipped"],
-            "running_tasks": ["List of task names still running"]
-        }}
-        """
-    )
+
+def format_tasks(tasks: List[Tuple[str, str, str]]) -> str:
+    """One 'Name|Status|Last execution' line per task (the prompt's input format)."""
+    return "\n".join("|".join(task) for task in tasks)
+
+
+# Status buckets of the prompt's hierarchy (lower-cased QMC statuses)
+_FAILED_STATUSES = frozenset({"failed", "error", "aborted", "skipped", "never started", "reset"})
+_RUNNING_STATUSES = frozenset({"started", "triggered", "retrying", "aborting"})
+_PENDING_STATUSES = frozenset({"queued"})
+_KNOWN_STATUSES = _FAILED_STATUSES | _RUNNING_STATUSES | _PENDING_STATUSES | {"success"}
+
+
+def fast_classify(tasks: List[Tuple[str, str, str]], allow_unknown: bool = False) -> Optional[Dict]:
+    """
+    Apply the prompt's status hierarchy in Python when every status is a known one.
+    Returns an AnalysisResult-shaped dict, or None to defer to the LLM; with
+    `allow_unknown`, unknown statuses count as pending instead.
+    """
+    statuses = [status.strip().lower() for _, status, _ in tasks]
+    if not statuses or not (allow_unknown or _KNOWN_STATUSES.issuperset(statuses)):
+        return None
     
-    chain = prompt | llm
+    total = len(tasks)
+    failed = [t[0] for t, s in zip(tasks, statuses) if s in _FAILED_STATUSES]
+    running = [t[0] for t, s in zip(tasks, statuses) if s in _RUNNING_STATUSES]
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=10),
-        retry=retry_if_exception_type((Exception,)),
-        before_sleep=lambda rs: logger.warning(f"Analysis failed for {process_name}, retrying ({rs.attempt_number}/3)...")
-    )
-    def _analyze_with_retry():
-        content = chain.invoke({
-            "process_name": process_name,
-            "tasks_json": json.dumps(simplified_tasks, indent=2)
-        }).content
-        return _parse_llm_response(content)
+    if failed:
+        status, summary = "Failed", f"{len(failed)} of {total} tasks failed: {', '.join(failed)}."
+    elif running:
+        status, summary = "Running", f"{len(running)} task(s) still running: {', '.join(running)}."
+    elif any(s != "success" for s in statuses):
+        queued = sum(s != "success" for s in statuses)
+        status, summary = "Pending", f"{queued} of {total} tasks queued."
+    else:
+        status, summary = "Success", f"All {total} tasks completed successfully."
     
-    try:
-        return _analyze_with_retry()
-    except Exception as e:
-        logger.error(f"LLM Analysis failed for {process_name} after retries: {e}")
-        return {"status": "Error", "summary": f"LLM Analysis failed: {str(e)}"}
+    return {"status": status, "summary": summary, "failed_tasks": failed, "running_tasks": running}
+
+
+@loop_cached
+def _analysis_chain():
+    """
+    Build the prompt | LLM chain once. The LLM answers through a tool call bound
+    to AnalysisResult, so the reply is validated by the schema, not by parsing text.
+    """
+    structured_llm = get_llm(0).with_structured_output(AnalysisResult)
+    return (ANALYSIS_PROMPT | structured_llm | RunnableLambda(lambda result: result.model_dump())).with_retry(
+        retry_if_exception_type=(Exception,),
+        wait_exponential_jitter=True,
+        stop_after_attempt=3
+    )
+
+
+# Parsed LLM results by (process, task rows); skips the call for unchanged groups
+_RESULT_CACHE = ResponseCache()
 
 
 # ============ Main Node (Parallel) ============
@@ -170,56 +154,80 @@ async def analyst_llm_node(state: QMCState) -> dict:
     """
     QMC Analyst Node:
     - Partitions data by TAGS/Process.
-    - Calls LLM in PARALLEL for each monitored process.
+    - Calls LLM in one batch (concurrent) for the monitored processes.
     - Aggregates results.
     """
     logger.info("Starting QMC LLM Analysis...")
     
-    llm = ChatGroq(
-        temperature=0, 
-        model_name=Config.GROQ_MODEL, 
-        api_key=Config.GROQ_API_KEY
-    )
-    
     all_tasks = state.get("structured_data") or []
     if not all_tasks:
         return {"process_reports": {}, "logs": ["QMC: No data to analyze"]}
     
-    # Partition Data by Tags
+    # Partition Data by Tags in one sweep: task counts plus the enabled tasks, simplified
     monitored_tags = Config.MONITORED_PROCESSES
+    totals = dict.fromkeys(monitored_tags, 0)
     partitions = {tag: [] for tag in monitored_tags}
     
     for task in all_tasks:
-        task_tags_str = str(task.get("Tags", ""))
-        for mon_key in monitored_tags:
-            if mon_key in task_tags_str:
-                partitions[mon_key].append(task)
-    
-    # Parallel LLM calls using asyncio (staggered to avoid rate limits)
-    async def _analyze_one(tag, p_tasks, delay):
-        await asyncio.sleep(delay)  # Stagger calls to avoid 429s
-        logger.info(f"  Analyzing {tag} ({len(p_tasks)} tasks)...")
-        if not p_tasks:
-            return tag, {"status": "Pending", "summary": "No execution records found for today."}
-        
-        # Run sync LLM call in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, analyze_group, tag, p_tasks, llm)
-        logger.info(f"  {tag}: {result.get('status')} - {result.get('summary')}")
-        return tag, result
-    
-    # Launch analyses with 0.5s stagger between each
-    tasks = [_analyze_one(tag, p_tasks, i * 0.5) for i, (tag, p_tasks) in enumerate(partitions.items())]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+        found = set(Config.MONITORED_TAGS_RE.findall(str(task.get("Tags", ""))))
+        if not found:
+            continue
+        simplified = simplify_task(task) if task.get("Enabled") == "Yes" else None
+        for mon_key in found:
+            totals[mon_key] += 1
+            if simplified is not None:
+                partitions[mon_key].append(simplified)
     
-    # Collect results
+    # Groups without enabled tasks are answered without an LLM call
     final_report = {}
-    for r in results:
-        if isinstance(r, Exception):
-            logger.error(f"Parallel analysis failed: {r}")
+    batch_tags, batch_inputs, batch_keys = [], [], []
+    for tag, simplified_tasks in partitions.items():
+        if not totals[tag]:
+            final_report[tag] = {"status": "Pending", "summary": "No execution records found for today."}
+            continue
+        if not simplified_tasks:
+            final_report[tag] = {"status": "No Run", "summary": "No ENABLED tasks found for this process today."}
+            continue
+        # Unambiguous statuses are classified without an LLM call
+        decided = fast_classify(simplified_tasks, allow_unknown=not Config.LLM_FALLBACK)
+        if decided is not None:
+            logger.info(f"  {tag}: {decided['status']} - {decided['summary']} (rule-based)")
+            final_report[tag] = decided
+            continue
+        # Pipe-delimited rows: no per-task keys, fewer prompt tokens than JSON
+        tasks_table = format_tasks(simplified_tasks)
+        cache_key = ResponseCache.key(tag, tasks_table)
+        cached = _RESULT_CACHE.get(cache_key)
+        if cached is not None:
+            logger.info(f"  {tag}: {cached['status']} - {cached['summary']} (unchanged, cached)")
+            final_report[tag] = cached
             continue
-        tag, analysis = r
-        final_report[tag] = analysis
+        logger.info(f"  Analyzing {tag} ({totals[tag]} tasks)...")
+        batch_tags.append(tag)
+        batch_keys.append(cache_key)
+        batch_inputs.append({"process_name": tag, "tasks_table": tasks_table})
+    
+    # One batched call over the groups the rules and the cache left undecided
+    results = []
+    if batch_inputs:
+        results = await _analysis_chain().abatch(
+            batch_inputs,
+            config={"max_concurrency": Config.LLM_CONCURRENCY},
+            return_exceptions=True
+        )
+    
+    # Collect results
+    for tag, cache_key, result in zip(batch_tags, batch_keys, results):
+        if isinstance(result, Exception):
+            logger.error(f"LLM Analysis failed for {tag} after retries: {result}")
+            result = {"status": "Error", "summary": f"LLM Analysis failed: {str(result)}"}
+        else:
+            logger.info(f"  {tag}: {result.get('status')} - {result.get('summary')}")
+            _RESULT_CACHE.put(cache_key, result)
+        final_report[tag] = result
+    
+    # Keep the monitored-process order for the report
+    final_report = {tag: final_report[tag] for tag in partitions if tag in final_report}
     
     return {
         "process_reports": final_report,
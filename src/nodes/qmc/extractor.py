@@ -3,13 +3,18 @@ QMC Agent - Extractor Node (Global V2)
 Wraps the extract_script_v2.py for LangGraph.
 """
 
-from src.playwright_runner import run_playwright_script
+import asyncio
+from pathlib import Path
+from src.playwright_runner import get_worker
 from src.config import Config
 from src.state import QMCState
-import json
 
 
-def extractor_node(state: QMCState) -> dict:
+# Same worker as login_node_sync: extract continues on the logged-in page
+_WORKER_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "qmc" / "worker.py"
+
+
+async def extractor_node(state: QMCState) -> dict:
     """
     Extractor Node:
     - Runs Playwright script to fetch ALL tasks for today.
@@ -26,11 +31,14 @@ def extractor_node(state: QMCState) -> dict:
         "timeout": Config.TIMEOUT_MS,
         "selectors": Config.SELECTORS,
         "pagination_max_clicks": Config.PAGINATION_MAX_CLICKS,
-        "browser_state_path": state.get("browser_state_path", "browser_state.json")
+        "browser_state_path": state.get("browser_state_path") or "browser_state.json",
+        # Login's in-memory session, used if the worker was recycled in between
+        "storage_state": state.get("browser_storage_state")
     }
     
-    # Run the V2 script
-    result = run_playwright_script("qmc/extract_script_v2.py", args)
+    # Run the V2 extraction in the worker that holds the logged-in page; the
+    # blocking pipe read (and orjson decode of the reply) stays off the event loop
+    result = await asyncio.to_thread(get_worker(_WORKER_SCRIPT).call, "extract", args)
     
     if not result.get("success"):
         return {
@@ -39,21 +47,15 @@ def extractor_node(state: QMCState) -> dict:
             "logs": [f"QMC Extraction Error: {result.get('error')}"]
         }
         
-    raw_data_json = result.get("raw_table_data", "[]")
+    rows = result.get("rows", [])
     total = result.get("total_extracted", 0)
     clicks = result.get("pagination_clicks", 0)
     
     log = f"QMC: Extracted {total} tasks (Pagination clicks: {clicks})"
     print(f"   [QMC Extractor] {log}")
     
-    # We update raw_table_data AND pre-parse it for the next step
+    # Rows arrive already decoded from the worker's JSON line
     return {
-        "raw_table_data": raw_data_json,
-        "structured_data": json.loads(raw_data_json),
+        "structured_data": rows,
         "logs": [log]
     }
-
-
-# Async wrapper for compatibility if needed
-async def extractor_node_async(state: QMCState) -> dict:
-    return extractor_node(state)
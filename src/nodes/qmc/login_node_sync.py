@@ -4,15 +4,20 @@ Runs Playwright in a completely separate process to avoid asyncio conflicts.
 """
 
 from datetime import datetime
-from src.playwright_runner import run_playwright_script
+from pathlib import Path
+from src.playwright_runner import get_worker
 from src.config import Config
 from src.state import QMCState
 
 
+# One long-lived Playwright process serves login and extract (same browser/page)
+_WORKER_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "qmc" / "worker.py"
+
+
 def login_node_sync(state: QMCState) -> dict:
     """
     Login node (subprocess version): Authenticates to QMC.
-    Runs Playwright in a completely separate Python process.
+    Runs Playwright in the shared QMC worker process.
     
     Args:
         state: Current workflow state
@@ -34,8 +39,8 @@ def login_node_sync(state: QMCState) -> dict:
         "max_retries": state.get("max_retries", 3)
     }
     
-    # Run the login script in a separate process
-    result = run_playwright_script("qmc/login_script.py", args)
+    # Run the login in the shared worker process (its page is reused by extract)
+    result = get_worker(_WORKER_SCRIPT).call("login", args)
     
     # Convert error_message to qmc_error for parallel execution compatibility
     if result.get("error_message"):
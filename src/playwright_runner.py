@@ -3,11 +3,25 @@ QMC Agent - Subprocess-based Playwright Runner
 Runs Playwright in a completely separate process to avoid asyncio conflicts in Jupyter.
 """
 
-import json
+import atexit
+import orjson
+import queue
 import subprocess
 import sys
+import threading
 import os
+from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def _script_env() -> Dict[str, str]:
+    """Environment for script processes: the project root on PYTHONPATH, so scripts can import src.*"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    return env
 
 
 def run_playwright_script(script_name: str, args: dict) -> dict:
@@ -32,8 +46,8 @@ def run_playwright_script(script_name: str, args: dict) -> dict:
             "error": f"Script not found: {script_path}"
         }
     
-    # Serialize arguments to JSON
-    args_json = json.dumps(args)
+    # Serialize arguments to JSON (read-only Config mappings are copied to dicts)
+    args_json = orjson.dumps(args, default=dict).decode()
     
     # Run the script in a separate process
     try:
@@ -42,7 +56,8 @@ def run_playwright_script(script_name: str, args: dict) -> dict:
             capture_output=True,
             text=True,
             timeout=300,  # 5 minute timeout for NPrinting pagination
-            cwd=str(Path(__file__).parent.parent)  # Run from project root
+            cwd=str(PROJECT_ROOT),  # Run from project root
+            env=_script_env()
         )
         
         if result.returncode != 0:
@@ -54,9 +69,9 @@ def run_playwright_script(script_name: str, args: dict) -> dict:
         
         # Parse JSON output from the script
         try:
-            output = json.loads(result.stdout)
+            output = orjson.loads(result.stdout)
             return output
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             return {
                 "success": False,
                 "error": "Failed to parse script output as JSON",
@@ -74,3 +89,182 @@ def run_playwright_script(script_name: str, args: dict) -> dict:
             "success": False,
             "error": str(e)
         }
+
+
+class PlaywrightWorker:
+    """
+    Long-lived Playwright subprocess that speaks JSON lines over stdin/stdout.
+    The worker keeps its browser open between calls, so only the first call
+    pays for the Python and Chromium start-up that run_playwright_script
+    pays every time.
+    """
+    
+    def __init__(self, script_path: Path, timeout: float = 300, max_calls: Optional[int] = None):
+        """
+        Args:
+            script_path: Worker script to run
+            timeout: Seconds to wait for each reply
+            max_calls: Restart the process (and its browser) after this many
+                calls, capping memory growth in long-running services
+        """
+        self.script_path = Path(script_path)
+        self.timeout = timeout
+        self.max_calls = max_calls
+        self._calls = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+    
+    def _start(self) -> None:
+        self._proc = subprocess.Popen(
+            [sys.executable, "-u", str(self.script_path)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            cwd=str(PROJECT_ROOT),  # Run from project root
+            env=_script_env()
+        )
+        self._calls = 0
+        self._lines = queue.Queue()
+        # Reader thread lets call() time out portably (select() does not work on Windows pipes)
+        threading.Thread(target=self._read_stdout, args=(self._proc, self._lines), daemon=True).start()
+    
+    @staticmethod
+    def _read_stdout(proc: subprocess.Popen, lines: "queue.Queue[str]") -> None:
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put("")  # EOF: the worker exited
+    
+    def call(self, cmd: str, args: dict) -> dict:
+        """
+        Run one command in the worker, starting it on first use.
+        
+        Returns:
+            Dictionary with results from the worker (same shape as the scripts)
+        """
+        if not self.script_path.exists():
+            return {
+                "success": False,
+                "error": f"Script not found: {self.script_path}"
+            }
+        
+        with self._lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None:
+                    self._start()
+                self._proc.stdin.write(orjson.dumps({"cmd": cmd, "args": args}, default=dict).decode() + "\n")
+                self._proc.stdin.flush()
+                line = self._lines.get(timeout=self.timeout)
+            except BrokenPipeError:
+                line = ""  # Died before reading the request
+            except queue.Empty:
+                self.close()
+                return {
+                    "success": False,
+                    "error": f"Worker timed out after {self.timeout} seconds"
+                }
+            except Exception as e:
+                self.close()
+                return {
+                    "success": False,
+                    "error": str(e)
+                }
+            
+            if not line:
+                self.close()
+                return {
+                    "success": False,
+                    "error": "Worker process exited unexpectedly"
+                }
+            
+            self._calls += 1
+            if self.max_calls is not None and self._calls >= self.max_calls:
+                self.close()  # Recycled: the next call starts a fresh process
+            
+            try:
+                return orjson.loads(line)
+            except orjson.JSONDecodeError:
+                return {
+                    "success": False,
+                    "error": "Failed to parse worker output as JSON",
+                    "stdout": line
+                }
+    
+    def close(self) -> None:
+        """Stop the worker process (its browser closes when stdin hits EOF)."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=10)
+        except Exception:
+            proc.kill()
+
+
+# Calls served by a shared worker before its browser process is recycled
+WORKER_MAX_CALLS = 40
+
+_WORKERS: Dict[str, PlaywrightWorker] = {}
+
+
+def get_worker(script_path: Path) -> PlaywrightWorker:
+    """Return the shared worker for a script, creating it on first use."""
+    key = str(Path(script_path).resolve())
+    worker = _WORKERS.get(key)
+    if worker is None:
+        worker = _WORKERS[key] = PlaywrightWorker(script_path, max_calls=WORKER_MAX_CALLS)
+    return worker
+
+
+@atexit.register
+def close_workers() -> None:
+    """Stop every worker started by get_worker()."""
+    for worker in _WORKERS.values():
+        worker.close()
+
+
+def serve(commands: Dict[str, Callable[[object, dict, dict], dict]]) -> None:
+    """
+    Worker-script side of PlaywrightWorker: keep one Chromium open and answer
+    each JSON request line on stdin with one JSON reply line on stdout.
+    
+    Args:
+        commands: Handler per command name, called as handler(browser, args, session);
+            `session` lets one command hand its context/page to the next and is
+            cleared whenever the browser is relaunched
+    """
+    from playwright.sync_api import sync_playwright  # Only worker processes need Playwright
+    
+    out = sys.stdout
+    sys.stdout = sys.stderr  # Stray prints must not corrupt the JSON channel
+    
+    with sync_playwright() as p:
+        browser = None
+        session = {}
+        try:
+            for line in sys.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    request = orjson.loads(line)
+                    handler = commands[request["cmd"]]
+                    args = request.get("args", {})
+                    if browser is None or not browser.is_connected():
+                        browser = p.chromium.launch(headless=args.get("headless", True))
+                        session.clear()
+                    result = handler(browser, args, session)
+                except Exception as e:
+                    # Login/filter report error_message, extract reports error
+                    result = {
+                        "success": False,
+                        "error": f"Worker command failed: {e}",
+                        "error_message": f"Worker command failed: {e}",
+                        "logs": [f"[{datetime.now().isoformat()}] WORKER: {e}"]
+                    }
+                out.write(orjson.dumps(result).decode() + "\n")
+                out.flush()
+        finally:
+            if browser is not None:
+                browser.close()
@@ -7,8 +7,8 @@ Usage: python extract_script.py '{"url": "...", ...}'
 import sys
 import json
 import os
-from datetime import datetime
 from playwright.sync_api import sync_playwright
+from src.browser_utils import block_assets, save_error_screenshot
 
 
 def apply_today_filter(page):
@@ -111,26 +111,33 @@ def extract_table_data(page):
     """)
 
 
-def run(playwright, args):
-    """Main extraction logic."""
+def run(browser, args, session=None):
+    """
+    Main extraction logic, in an already launched `browser`.
+    
+    In worker mode `session` may hold the page login left open (logged in,
+    on the tasks page); it is used instead of restoring the saved state.
+    """
     browser_state_path = args.get("nprinting_state_path", "nprinting_browser_state.json")
-    headless = args.get("headless", True)
     url = args.get("url")
     timeout = args.get("timeout", 60000)
     
-    browser = playwright.chromium.launch(headless=headless)
-    
-    if browser_state_path and os.path.exists(browser_state_path):
-        context = browser.new_context(storage_state=browser_state_path, ignore_https_errors=True)
+    page = session.pop("page", None) if session else None
+    if page is not None:
+        context = session.pop("context")
     else:
-        context = browser.new_context(ignore_https_errors=True)
-    
-    page = context.new_page()
+        if browser_state_path and os.path.exists(browser_state_path):
+            context = browser.new_context(storage_state=browser_state_path, ignore_https_errors=True)
+        else:
+            context = browser.new_context(ignore_https_errors=True)
+        context.route("**/*", block_assets)
     
     try:
-        # 1. Navigate to NPrinting
-        page.goto(url, timeout=timeout, wait_until="networkidle")
-        page.wait_for_timeout(2000)
+        # 1. Navigate to NPrinting (skipped on the page handed over by login)
+        if page is None:
+            page = context.new_page()
+            page.goto(url, timeout=timeout, wait_until="networkidle")
+            page.wait_for_timeout(2000)
         
         # 2. Wait for table
         page.wait_for_selector("table", timeout=timeout)
@@ -171,7 +178,7 @@ def run(playwright, args):
         
         return {
             "success": True,
-            "raw_data": json.dumps(unique_data),
+            "rows": unique_data,
             "total": len(unique_data),
             "pages_extracted": page_num,
             "filter_applied": filter_applied,
@@ -179,16 +186,11 @@ def run(playwright, args):
         }
         
     except Exception as e:
-        screenshot_path = f"error_nprinting_{datetime.now().strftime('%H%M%S')}.png"
-        try:
-            page.screenshot(path=screenshot_path)
-        except:
-            screenshot_path = None
-        
+        screenshot_path = save_error_screenshot(page, "nprinting")
         return {"success": False, "error": str(e), "screenshot": screenshot_path}
         
     finally:
-        browser.close()
+        context.close()
 
 
 if __name__ == "__main__":
@@ -203,5 +205,9 @@ if __name__ == "__main__":
         sys.exit(1)
     
     with sync_playwright() as p:
-        result = run(p, args_input)
+        browser = p.chromium.launch(headless=args_input.get("headless", True))
+        try:
+            result = run(browser, args_input)
+        finally:
+            browser.close()
         print(json.dumps(result))
@@ -7,7 +7,26 @@ import sys
 import json
 import time
 import os
+from functools import lru_cache
 from playwright.sync_api import sync_playwright
+from src.browser_utils import block_assets
+
+@lru_cache(maxsize=None)
+def _selector_alternatives(selector):
+    """Split a comma-joined selector into its alternatives (once per string)."""
+    return tuple(s.strip() for s in selector.split(",") if s.strip())
+
+def best_locator(page, selector):
+    """
+    Resolve a comma-joined selector one alternative at a time.
+    The primary selector is tried first; fallbacks are only queried on a miss.
+    """
+    alternatives = _selector_alternatives(selector)
+    for alt in alternatives:
+        locator = page.locator(alt)
+        if locator.count() > 0:
+            return locator.first
+    return page.locator(alternatives[0]).first
 
 def login_if_needed(page, args, selectors):
     """Handle login if redirected to login page."""
@@ -24,14 +43,17 @@ def login_if_needed(page, args, selectors):
         password_sel = selectors.get("password_input", "input[name='password']")
         login_btn_sel = selectors.get("login_button", "button[type='submit']")
         
-        if page.locator(username_sel).is_visible():
-            page.fill(username_sel, args.get("username", ""))
-            page.fill(password_sel, args.get("password", ""))
+        username_input = best_locator(page, username_sel)
+        if username_input.is_visible():
+            password_input = best_locator(page, password_sel)
+            username_input.fill(args.get("username", ""))
+            password_input.fill(args.get("password", ""))
             
-            if page.locator(login_btn_sel).is_visible():
-                page.click(login_btn_sel)
+            login_btn = best_locator(page, login_btn_sel)
+            if login_btn.is_visible():
+                login_btn.click()
             else:
-                page.press(password_sel, "Enter")
+                password_input.press("Enter")
                 
             page.wait_for_load_state("networkidle")
             return True
@@ -147,27 +169,38 @@ def extract_table_data(page):
         }
     """)
 
-def run(playwright, args):
+def run(browser, args, session=None):
+    """
+    Extract today's tasks in an already launched `browser`.
+    
+    In worker mode `session` may hold the page login left open (logged in,
+    grid loaded); it is used instead of restoring browser_state.json. Without
+    it, an in-memory `storage_state` dict is preferred over the state file.
+    """
     browser_state_path = args.get("browser_state_path")
-    headless = args.get("headless", True)
+    storage_state = args.get("storage_state")
     selectors = args.get("selectors", {})
     
-    # Launch Browser
-    browser = playwright.chromium.launch(headless=headless)
-    
-    # Context (Session Reuse)
-    if browser_state_path and os.path.exists(browser_state_path):
-        context = browser.new_context(storage_state=browser_state_path, ignore_https_errors=True)
+    page = session.pop("page", None) if session else None
+    if page is not None:
+        context = session.pop("context")
     else:
-        context = browser.new_context(ignore_https_errors=True)
-        
-    page = context.new_page()
+        # Context (Session Reuse)
+        if storage_state:
+            context = browser.new_context(storage_state=storage_state, ignore_https_errors=True)
+        elif browser_state_path and os.path.exists(browser_state_path):
+            context = browser.new_context(storage_state=browser_state_path, ignore_https_errors=True)
+        else:
+            context = browser.new_context(ignore_https_errors=True)
+        context.route("**/*", block_assets)
     
     try:
-        # 1. Navigate & Login
-        page.goto(args.get("url"))
-        page.wait_for_load_state("networkidle")
-        login_if_needed(page, args, selectors)
+        # 1. Navigate & Login (skipped on the page handed over by login)
+        if page is None:
+            page = context.new_page()
+            page.goto(args.get("url"))
+            page.wait_for_load_state("networkidle")
+            login_if_needed(page, args, selectors)
         
         # 2. Wait for Grid
         grid_sel = selectors.get("grid", "table")
@@ -198,7 +231,7 @@ def run(playwright, args):
         
         return {
             "success": True,
-            "raw_table_data": json.dumps(data),
+            "rows": data,
             "total_extracted": len(data),
             "pagination_clicks": click_count
         }
@@ -206,7 +239,7 @@ def run(playwright, args):
     except Exception as e:
         return {"success": False, "error": str(e)}
     finally:
-        browser.close()
+        context.close()
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -221,7 +254,11 @@ if __name__ == "__main__":
         
     try:
         with sync_playwright() as p:
-            result = run(p, args_input)
+            browser = p.chromium.launch(headless=args_input.get("headless", True))
+            try:
+                result = run(browser, args_input)
+            finally:
+                browser.close()
             print(json.dumps(result))
     except Exception as e:
         print(json.dumps({"success": False, "error": f"Critical Error: {str(e)}"}))
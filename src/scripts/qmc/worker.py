@@ -0,0 +1,21 @@
+"""
+QMC Playwright Worker Script
+Long-lived process that keeps one Chromium open and serves login/extract
+commands, one JSON object per line on stdin/stdout. The page left by login
+is handed to extract, so the session is never restored from disk.
+Usage: python -u worker.py   (then write '{"cmd": "login", "args": {...}}\n')
+"""
+
+from src.playwright_runner import serve
+
+import extract_script_v2
+import login_script
+
+COMMANDS = {
+    "login": login_script.run,
+    "extract": extract_script_v2.run,
+}
+
+
+if __name__ == "__main__":
+    serve(COMMANDS)
@@ -31,6 +31,9 @@ class QMCState(TypedDict):
     browser_state_path: Optional[str]
     """Path to saved browser state for session reuse."""
     
+    browser_storage_state: Optional[dict]
+    """In-memory browser state (cookies/origins) for in-process session reuse."""
+    
     # ========== QMC Extracted Data ==========
     page_html: Optional[str]
     """Raw HTML of current page."""
@@ -54,6 +57,9 @@ class QMCState(TypedDict):
     nprinting_retry_count: int
     """Number of retries for NPrinting operations."""
     
+    nprinting_session_reused: bool
+    """True when login was skipped in favour of the saved NPrinting session."""
+    
     # ========== NPrinting Extracted Data ==========
     nprinting_raw_data: Optional[str]
     """Raw table data extracted from NPrinting."""
@@ -99,6 +105,7 @@ def create_initial_state() -> QMCState:
         # QMC
         session_cookies=None,
         browser_state_path=None,
+        browser_storage_state=None,
         page_html=None,
         raw_table_data=None,
         structured_data=None,
@@ -107,6 +114,7 @@ def create_initial_state() -> QMCState:
         nprinting_cookies=None,
         nprinting_state_path=None,
         nprinting_retry_count=0,
+        nprinting_session_reused=False,
         nprinting_raw_data=None,
         nprinting_data=None,
         nprinting_reports=None,
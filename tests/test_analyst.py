@@ -0,0 +1,113 @@
+"""
+QMC Agent - Legacy Analyst Tests
+"""
+
+from datetime import datetime
+
+
+class TestParseDatetime:
+    """Test datetime parsing used to order tasks."""
+    
+    def test_iso_formats(self):
+        """Test ISO-like formats with and without seconds."""
+        from src.legacy.analyst import parse_datetime
+        
+        assert parse_datetime("2026-01-27T06:15:30") == datetime(2026, 1, 27, 6, 15, 30)
+        assert parse_datetime("2026-01-27 06:15:30") == datetime(2026, 1, 27, 6, 15, 30)
+        assert parse_datetime("2026-01-27T06:15") == datetime(2026, 1, 27, 6, 15)
+        assert parse_datetime("2026-01-27 06:15") == datetime(2026, 1, 27, 6, 15)
+    
+    def test_day_first_format(self):
+        """Test DD/MM/YYYY HH:MM format."""
+        from src.legacy.analyst import parse_datetime
+        
+        assert parse_datetime("27/01/2026 06:15") == datetime(2026, 1, 27, 6, 15)
+    
+    def test_invalid_values(self):
+        """Test empty, unknown and out-of-range values return None."""
+        from src.legacy.analyst import parse_datetime
+        
+        assert parse_datetime(None) is None
+        assert parse_datetime("") is None
+        assert parse_datetime("Never") is None
+        assert parse_datetime("2026-13-27 06:15") is None
+
+
+class TestCountStatuses:
+    """Test status classification and counting."""
+    
+    def test_classify_status(self):
+        """Test statuses map to their summary category."""
+        from src.legacy.analyst import classify_status
+        
+        assert classify_status("Success") == "completadas"
+        assert classify_status("skipped") == "saltadas"
+        assert classify_status("Running") == "en_ejecucion"
+        assert classify_status("Queued") == "pendientes"
+        assert classify_status("Aborted") == "fallidas"
+        assert classify_status("Unknown") == "otro"
+        assert classify_status(None) == "otro"
+    
+    def test_count_statuses(self):
+        """Test counts per category ignore unknown statuses."""
+        from src.legacy.analyst import analyze_process_status
+        
+        summary = analyze_process_status([
+            {"Status": "Success"},
+            {"Status": "SUCCEEDED"},
+            {"Status": "Failed"},
+            {"Status": "Started"},
+            {"Status": None},
+            {},
+        ]).resumen
+        
+        assert summary.total_tareas == 6
+        assert summary.completadas == 2
+        assert summary.fallidas == 1
+        assert summary.pendientes == 1
+        assert summary.en_ejecucion == 0
+        assert summary.saltadas == 0
+
+
+class TestAnalyzeProcessStatus:
+    """Test the full process analysis."""
+    
+    def test_orders_tasks_and_finds_start(self):
+        """Test tasks are ordered by execution and the start task is detected."""
+        from src.legacy.analyst import analyze_process_status
+        
+        status = analyze_process_status([
+            {"Name": "CARGA_FACT", "Status": "Running", "Last_execution": "2026-01-27T06:49:00"},
+            {"Name": "PUBLISH_NP", "Status": "Started", "Last_execution": None},
+            {"Name": "INICIO_MALLA", "Status": "Success", "Last_execution": "2026-01-27T06:15:00"},
+        ], "FE_HITOS_DIARIO")
+        
+        assert [t["Name"] for t in status.tareas] == ["INICIO_MALLA", "CARGA_FACT", "PUBLISH_NP"]
+        assert status.tarea_inicio == "INICIO_MALLA"
+        assert status.resumen.completadas == 1
+        assert status.resumen.en_ejecucion == 1
+        assert status.resumen.pendientes == 1
+        assert status.estado == "En proceso"
+    
+    def test_detect_process_name(self):
+        """Test the process name comes from the first FE_HITOS tag."""
+        from src.legacy.analyst import detect_process_name
+        
+        assert detect_process_name([
+            {"Tags": "OTHER, fe_hitos_semanal"},
+            {"Tags": ["FE_HITOS_DIARIO"]},
+        ]) == "fe_hitos_semanal"
+        assert detect_process_name([{"Tags": None}, {}]) == "FE_HITOS_DIARIO"
+    
+    def test_order_tasks_by_execution(self):
+        """Test tasks are ordered by execution time, unknown times last."""
+        from src.legacy.analyst import analyze_process_status
+        
+        tasks = [
+            {"Name": "b", "Last_execution": "2026-01-27T06:49:00"},
+            {"Name": "c", "Last_execution": None},
+            {"Name": "a", "Last execution": "27/01/2026 06:15"},
+            {"Name": "d"},
+        ]
+        
+        assert [t["Name"] for t in analyze_process_status(tasks).tareas] == ["a", "b", "c", "d"]
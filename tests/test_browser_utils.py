@@ -0,0 +1,86 @@
+"""
+QMC Agent - Shared Playwright Page Helper Tests
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeRoute:
+    """Route stub recording whether it was aborted or continued."""
+
+    def __init__(self, resource_type, url="https://qmc/api/tasks"):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.action = None
+
+    def abort(self):
+        self.action = "abort"
+        return self.action
+
+    def continue_(self):
+        self.action = "continue"
+        return self.action
+
+
+class TestBlockAssets:
+    """Test the shared route handler."""
+
+    def test_blocks_by_resource_type(self):
+        """Test images, fonts and media are aborted even without a file extension."""
+        from src.browser_utils import block_assets
+
+        for resource_type in ("image", "font", "media"):
+            route = FakeRoute(resource_type, url="https://qmc/resources/asset?id=42")
+            block_assets(route)
+            assert route.action == "abort"
+
+    def test_blocks_telemetry(self):
+        """Test telemetry hosts are aborted whatever their resource type."""
+        from src.browser_utils import block_assets
+
+        route = FakeRoute("script", url="https://www.google-analytics.com/analytics.js")
+        block_assets(route)
+        assert route.action == "abort"
+
+    def test_lets_the_rest_through(self):
+        """Test documents and API calls continue, returning the route call for the async API to await."""
+        from src.browser_utils import block_assets
+
+        for resource_type in ("document", "xhr", "stylesheet"):
+            route = FakeRoute(resource_type)
+            assert block_assets(route) == "continue"
+
+
+class FailingPage:
+    """Page whose screenshot fails (e.g. the browser already went away)."""
+
+    def screenshot(self, **kwargs):
+        raise RuntimeError("Target closed")
+
+
+class TestErrorScreenshot:
+    """Test the final-failure screenshot helpers."""
+
+    def test_viewport_jpeg_path(self):
+        """Test the file name carries the step and retry, and the shot is a viewport JPEG."""
+        from src.browser_utils import save_error_screenshot
+
+        taken = []
+        page = SimpleNamespace(screenshot=lambda **kwargs: taken.append(kwargs))
+
+        path = save_error_screenshot(page, "login", 2)
+
+        assert path.startswith("error_login_2_") and path.endswith(".jpg")
+        assert taken == [{"path": path, "type": "jpeg", "quality": 60, "full_page": False}]
+
+    def test_failure_returns_none(self):
+        """Test a screenshot error never masks the step's own error."""
+        from src.browser_utils import save_error_screenshot, save_error_screenshot_async
+
+        assert save_error_screenshot(FailingPage(), "nprinting") is None
+
+        async def failing_screenshot(**kwargs):
+            raise RuntimeError("Target closed")
+
+        page = SimpleNamespace(screenshot=failing_screenshot)
+        assert asyncio.run(save_error_screenshot_async(page, "filter", 0)) is None
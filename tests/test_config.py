@@ -27,6 +27,14 @@ class TestConfig:
         assert "spinner" in Config.SELECTORS
         assert "grid" in Config.SELECTORS
     
+    def test_nprinting_prefix_index(self):
+        """Test the NPrinting prefix index covers every monitored prefix."""
+        from src.config import Config
+        
+        indexed = {p for entries in Config.NPRINTING_PREFIX_INDEX.values() for _, p in entries}
+        assert indexed == set(Config.NPRINTING_MONITORED)
+        assert Config.NPRINTING_PREFIX_INDEX["q"] == (("q1.", "q1."),)
+    
     def test_validate_missing_credentials(self):
         """Test validation reports missing credentials."""
         from src.config import Config
@@ -58,6 +66,17 @@ class TestConfig:
             
             missing = src.config.Config.validate()
             assert len(missing) == 0
+    
+    def test_load_environment_runs_once(self, monkeypatch):
+        """Test that the .env file is only parsed once per process."""
+        import src.config
+        
+        # Start unloaded (import already ran it), so the guard itself is exercised
+        monkeypatch.setattr(src.config, "_ENV_LOADED", False)
+        with patch.object(src.config, "load_dotenv") as mock_load:
+            src.config.load_environment()
+            src.config.load_environment()
+            mock_load.assert_called_once()
 
 
 class TestState:
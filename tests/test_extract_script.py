@@ -0,0 +1,46 @@
+"""
+QMC Agent - Legacy Extract Script Tests
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT = Path(__file__).resolve().parents[1] / "src" / "legacy" / "scripts" / "extract_script.py"
+
+
+@pytest.fixture
+def extract_script():
+    """Load the standalone script as a module (it is not part of the src package)."""
+    spec = importlib.util.spec_from_file_location("extract_script", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+HEADS = ["Name", "Status", "Last execution"]
+ROWS = [f"FE_TASK_{i} Success 2026-01-27 06:{i:02d}:00" for i in range(10)]
+
+
+class TestGridSnapshots:
+    """Test the unchanged-grid cache of the extract script."""
+
+    def test_middle_row_change_misses_cache(self, extract_script):
+        """Test a status change in a middle row (same row count) is not served from cache."""
+        args = {"url": "https://qmc/tasks", "selectors": {"grid": ".qmc-grid"}}
+        key = extract_script.snapshot_key(args)
+        extract_script._snapshots[key] = (extract_script.grid_fingerprint(HEADS, ROWS), "old data")
+
+        assert extract_script.cached_extraction(key, extract_script.grid_fingerprint(HEADS, ROWS)) == "old data"
+
+        changed = list(ROWS)
+        changed[5] = changed[5].replace("Success", "Failed")
+        assert extract_script.cached_extraction(key, extract_script.grid_fingerprint(HEADS, changed)) is None
+
+    def test_key_includes_filters(self, extract_script):
+        """Test the same URL with different filters uses different snapshots."""
+        base = {"url": "https://qmc/tasks", "selectors": {"grid": ".qmc-grid"}}
+
+        assert extract_script.snapshot_key(base) != extract_script.snapshot_key({**base, "filters": {"tags": "FE_HITOS"}})
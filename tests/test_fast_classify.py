@@ -0,0 +1,101 @@
+"""
+QMC Agent - Rule-Based Classification Tests
+"""
+
+
+class TestQmcFastClassify:
+    """Test the QMC analyst's in-Python status hierarchy."""
+
+    def test_hierarchy_order(self):
+        """Test Failed > Running > Pending > Success."""
+        from src.nodes.qmc.analyst_llm import fast_classify
+
+        tasks = [("A", "Success", ""), ("B", "Queued", ""), ("C", "Started", ""), ("D", "Failed", "")]
+
+        assert fast_classify(tasks)["status"] == "Failed"
+        assert fast_classify(tasks[:3])["status"] == "Running"
+        assert fast_classify(tasks[:2])["status"] == "Pending"
+        assert fast_classify(tasks[:1])["status"] == "Success"
+
+    def test_failed_and_running_names(self):
+        """Test the failed and running task lists keep grid order."""
+        from src.nodes.qmc.analyst_llm import fast_classify
+
+        result = fast_classify([("A", "Error", ""), ("B", "Retrying", ""), ("C", "Aborted", "")])
+
+        assert result["failed_tasks"] == ["A", "C"]
+        assert result["running_tasks"] == ["B"]
+
+    def test_unknown_status(self):
+        """Test an unknown status defers to the LLM unless allow_unknown is set."""
+        from src.nodes.qmc.analyst_llm import fast_classify
+
+        tasks = [("A", "Success", ""), ("B", "Paused", "")]
+
+        assert fast_classify(tasks) is None
+        assert fast_classify(tasks, allow_unknown=True)["status"] == "Pending"
+
+    def test_empty_input(self):
+        """Test no tasks defers to the LLM."""
+        from src.nodes.qmc.analyst_llm import fast_classify
+
+        assert fast_classify([]) is None
+        assert fast_classify([], allow_unknown=True) is None
+
+
+def report(name, status, progress="100%"):
+    """Build an NPrinting task row."""
+    return {"Task name": name, "Status": status, "Progress": progress, "Created": "2026-01-27 06:00"}
+
+
+class TestNPrintingFastClassify:
+    """Test the NPrinting analyst's in-Python status hierarchy."""
+
+    def test_hierarchy_order(self):
+        """Test Failed > Running > Pending > Success."""
+        from src.nodes.nprinting.analyst import fast_classify
+
+        tasks = [report("A", "Completed"), report("B", "Queued"), report("C", "Running"), report("D", "Failed")]
+
+        assert fast_classify(tasks)["status"] == "Failed"
+        assert fast_classify(tasks[:3])["status"] == "Running"
+        assert fast_classify(tasks[:2])["status"] == "Pending"
+
+        result = fast_classify(tasks[:1])
+        assert result["status"] == "Success"
+        assert result["completed_tasks"] == 1
+
+    def test_completed_below_full_progress_is_running(self):
+        """Test a Completed report below 100% is still generating."""
+        from src.nodes.nprinting.analyst import fast_classify
+
+        result = fast_classify([report("A", "Completed"), report("B", "Completed", "60%")])
+
+        assert result["status"] == "Running"
+        assert result["running_tasks"] == ["B"]
+        assert result["completed_tasks"] == 1
+
+    def test_unknown_status(self):
+        """Test an unknown status defers to the LLM unless allow_unknown is set."""
+        from src.nodes.nprinting.analyst import fast_classify
+
+        tasks = [report("A", "Completed"), report("B", "Paused")]
+
+        assert fast_classify(tasks) is None
+        assert fast_classify(tasks, allow_unknown=True)["status"] == "Pending"
+
+    def test_unreadable_progress(self):
+        """Test a Completed report without a numeric progress defers to the LLM."""
+        from src.nodes.nprinting.analyst import fast_classify
+
+        tasks = [report("A", "Completed", "")]
+
+        assert fast_classify(tasks) is None
+        assert fast_classify(tasks, allow_unknown=True)["status"] == "Running"
+
+    def test_empty_input(self):
+        """Test no tasks defers to the LLM."""
+        from src.nodes.nprinting.analyst import fast_classify
+
+        assert fast_classify([]) is None
+        assert fast_classify([], allow_unknown=True) is None
@@ -0,0 +1,69 @@
+"""
+QMC Agent - Shared LLM Client Tests
+"""
+
+import asyncio
+
+
+class TestLoopCached:
+    """Test per-event-loop caching of LLM objects."""
+
+    def test_cached_within_a_loop_and_rebuilt_per_loop(self):
+        """Test one object per loop, and close_http_clients() drops the loop's entry."""
+        from src.nodes import llm
+
+        @llm.loop_cached
+        def build(key):
+            return object()
+
+        async def run():
+            first = build("a")
+            assert build("a") is first
+            await llm.close_http_clients()
+            return first
+
+        assert asyncio.run(run()) is not asyncio.run(run())
+        assert not llm._loop_caches
+
+
+class TestResponseCache:
+    """Test the LRU of parsed LLM results."""
+
+    def test_hit_and_miss(self):
+        """Test equal inputs hit and different inputs miss."""
+        from src.nodes.llm import ResponseCache
+
+        cache = ResponseCache()
+        cache.put(ResponseCache.key("FE_HITOS", "A|Success|"), {"status": "Success"})
+
+        assert cache.get(ResponseCache.key("FE_HITOS", "A|Success|")) == {"status": "Success"}
+        assert cache.get(ResponseCache.key("FE_HITOS", "A|Failed|")) is None
+
+    def test_evicts_least_recently_used(self):
+        """Test the oldest untouched entry is dropped past maxsize."""
+        from src.nodes.llm import ResponseCache
+
+        cache = ResponseCache(maxsize=2)
+        cache.put("a", {"n": 1})
+        cache.put("b", {"n": 2})
+        cache.get("a")  # "b" is now the least recently used
+        cache.put("c", {"n": 3})
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"n": 1}
+        assert cache.get("c") == {"n": 3}
+
+    def test_results_are_copies(self):
+        """Test mutating a stored or returned result never changes the cache."""
+        from src.nodes.llm import ResponseCache
+
+        cache = ResponseCache()
+        result = {"status": "Failed", "failed_tasks": ["A"]}
+        cache.put("k", result)
+        result["failed_tasks"].append("B")
+
+        hit = cache.get("k")
+        hit["prefix"] = "h."
+        hit["failed_tasks"].append("C")
+
+        assert cache.get("k") == {"status": "Failed", "failed_tasks": ["A"]}
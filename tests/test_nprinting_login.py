@@ -0,0 +1,86 @@
+"""
+QMC Agent - NPrinting Session Reuse Tests
+"""
+
+import json
+import time
+
+
+def write_state(path, expires):
+    """Write a Playwright storage_state file with one auth cookie."""
+    from src.config import Config
+
+    cookie = {"name": Config.NPRINTING_AUTH_COOKIES[0], "value": "abc", "expires": expires}
+    path.write_text(json.dumps({"cookies": [cookie], "origins": []}))
+    return path
+
+
+class TestCachedSession:
+    """Test the saved-session check that short-circuits login."""
+
+    def test_valid_cookie_is_reused(self, tmp_path):
+        """Test a cookie valid beyond COOKIE_MIN_TTL returns the cookies."""
+        from src.config import Config
+        from src.nodes.nprinting.login_node import _cached_session
+
+        state_file = write_state(tmp_path / "state.json", time.time() + Config.COOKIE_MIN_TTL + 3600)
+        assert _cached_session(state_file) == {Config.NPRINTING_AUTH_COOKIES[0]: "abc"}
+
+    def test_expired_cookie_is_not_reused(self, tmp_path):
+        """Test a cookie expiring within COOKIE_MIN_TTL forces a login."""
+        from src.nodes.nprinting.login_node import _cached_session
+
+        state_file = write_state(tmp_path / "state.json", time.time() + 10)
+        assert _cached_session(state_file) is None
+
+    def test_session_only_cookie_is_not_reused(self, tmp_path):
+        """Test a session cookie (expires = -1) forces a login."""
+        from src.nodes.nprinting.login_node import _cached_session
+
+        state_file = write_state(tmp_path / "state.json", -1)
+        assert _cached_session(state_file) is None
+
+    def test_missing_file(self, tmp_path):
+        """Test no saved state forces a login."""
+        from src.nodes.nprinting.login_node import _cached_session
+
+        assert _cached_session(tmp_path / "missing.json") is None
+
+
+class FakeWorker:
+    """Worker whose first extract fails (dead session) and later calls succeed."""
+
+    def __init__(self):
+        self.calls = []
+
+    def call(self, cmd, args):
+        self.calls.append(cmd)
+        if cmd == "login":
+            return {"success": True, "nprinting_cookies": {"s": "new"}, "nprinting_state_path": "state.json", "logs": []}
+        if self.calls.count("extract") == 1:
+            return {"success": False, "error": "table not found"}
+        return {"success": True, "rows": [{"Task name": "h. Report"}], "total": 1}
+
+
+class TestReusedSessionFallback:
+    """Test the extractor logs in again when a reused session is dead."""
+
+    def test_failed_extract_on_reused_session_logs_in(self, tmp_path, monkeypatch):
+        """Test the state file is dropped and extraction is retried after a real login."""
+        from src.nodes.nprinting import extractor, login_node
+        from src.state import create_initial_state
+
+        worker = FakeWorker()
+        state_file = write_state(tmp_path / "state.json", time.time() + 86400)
+        monkeypatch.setattr(login_node, "_STATE_FILE", state_file)
+        monkeypatch.setattr(login_node, "get_worker", lambda path: worker)
+        monkeypatch.setattr(extractor, "get_worker", lambda path: worker)
+
+        state = create_initial_state()
+        state["nprinting_session_reused"] = True
+        result = extractor.nprinting_extractor_node(state)
+
+        assert worker.calls == ["extract", "login", "extract"]
+        assert not state_file.exists()
+        assert result["nprinting_data"] == [{"Task name": "h. Report"}]
+        assert result["nprinting_session_reused"] is False
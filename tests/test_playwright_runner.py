@@ -0,0 +1,68 @@
+"""
+QMC Agent - Playwright Runner Tests
+"""
+
+
+ECHO_WORKER = """
+import json, os, sys
+for line in sys.stdin:
+    request = json.loads(line)
+    print(json.dumps({"cmd": request["cmd"], "args": request["args"], "pid": os.getpid()}), flush=True)
+"""
+
+
+class TestPlaywrightWorker:
+    """Test the long-lived JSON-lines worker."""
+    
+    def test_worker_is_reused_between_calls(self, tmp_path):
+        """Test consecutive calls are served by the same process."""
+        from src.playwright_runner import PlaywrightWorker
+        
+        script = tmp_path / "echo_worker.py"
+        script.write_text(ECHO_WORKER)
+        worker = PlaywrightWorker(script, timeout=30)
+        try:
+            first = worker.call("filter", {"url": "x"})
+            second = worker.call("extract", {"url": "y"})
+        finally:
+            worker.close()
+        
+        assert first["cmd"] == "filter" and first["args"] == {"url": "x"}
+        assert second["cmd"] == "extract"
+        assert first["pid"] == second["pid"]
+    
+    def test_worker_is_recycled_after_max_calls(self, tmp_path):
+        """Test the process is restarted once max_calls is reached."""
+        from src.playwright_runner import PlaywrightWorker
+        
+        script = tmp_path / "echo_worker.py"
+        script.write_text(ECHO_WORKER)
+        worker = PlaywrightWorker(script, timeout=30, max_calls=2)
+        try:
+            pids = [worker.call("extract", {})["pid"] for _ in range(3)]
+        finally:
+            worker.close()
+        
+        assert pids[0] == pids[1]
+        assert pids[2] != pids[1]
+    
+    def test_worker_exit_is_reported(self, tmp_path):
+        """Test a worker that dies returns an error instead of hanging."""
+        from src.playwright_runner import PlaywrightWorker
+        
+        script = tmp_path / "dead_worker.py"
+        script.write_text("import sys; sys.exit(1)\n")
+        worker = PlaywrightWorker(script, timeout=30)
+        
+        result = worker.call("extract", {})
+        
+        assert result["success"] is False
+        assert "exited" in result["error"]
+    
+    def test_missing_script(self, tmp_path):
+        """Test a missing worker script is reported."""
+        from src.playwright_runner import PlaywrightWorker
+        
+        result = PlaywrightWorker(tmp_path / "nope.py").call("extract", {})
+        
+        assert result["success"] is False